@@ -0,0 +1,66 @@
+# analytics.py
+print("Loading analytics module...")
+
+import os
+import threading
+import time
+
+from cache import shared_cache
+from database import (get_population_totals, get_win_rate_distribution,
+                      get_top_assets, get_persona_counts)
+
+# Population aggregates are recomputed in the background on this interval
+REFRESH_SECONDS = float(os.environ.get("ANALYTICS_REFRESH_SECONDS", "60"))
+
+AGGREGATES = {
+    "overview": get_population_totals,
+    "win_rates": get_win_rate_distribution,
+    "assets": get_top_assets,
+    "personas": get_persona_counts
+}
+
+# Results are shared by all workers; whichever worker holds the refresh lease
+# recomputes them, the others only read
+RESULT_TTL_SECONDS = REFRESH_SECONDS * 10
+REFRESH_LEASE_KEY = "analytics:refresh-lease"
+
+_lock = threading.Lock()
+_refresher = None
+
+def _result_key(name):
+    return f"analytics:{name}"
+
+def refresh_analytics():
+    """Recompute every population aggregate and replace the cached results"""
+    for name, compute in AGGREGATES.items():
+        try:
+            result = {"data": compute(), "computed_at": time.time()}
+        except Exception as e:
+            print(f"✗ Error computing {name} analytics: {e}")
+            continue
+        shared_cache.set(_result_key(name), result, ttl=RESULT_TTL_SECONDS)
+
+def _refresh_loop():
+    while True:
+        if shared_cache.add(REFRESH_LEASE_KEY, os.getpid(), ttl=REFRESH_SECONDS):
+            refresh_analytics()
+        time.sleep(REFRESH_SECONDS)
+
+def start_refresher():
+    """Start the background refresh thread once per process"""
+    global _refresher
+    with _lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_loop, name="analytics-refresh", daemon=True)
+            _refresher.start()
+
+def get_analytics(name):
+    """Cached aggregate by name; computed on the spot if the refresher has not produced it yet"""
+    start_refresher()
+    cached = shared_cache.get(_result_key(name))
+    if cached is None:
+        cached = {"data": AGGREGATES[name](), "computed_at": time.time()}
+        shared_cache.set(_result_key(name), cached, ttl=RESULT_TTL_SECONDS)
+    return cached
+
+print("✓ Analytics module loaded successfully")
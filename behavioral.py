@@ -32,7 +32,7 @@ def analyze_behavior(derived_metrics, user_responses):
         "max_drawdown": derived_metrics.get("max_drawdown", 0),
         "avg_holding_time": derived_metrics.get("avg_holding_time", 0),
         "trade_frequency": derived_metrics.get("trade_frequency", 0),
-        "active_hours": "Market Hours",  
+        "active_hours": derived_metrics.get("active_hours", "Market Hours"),
         "market_sentiment_alignment": derived_metrics.get("market_sentiment_alignment", 0.5),
         "response_to_loss": response_patterns["loss_response"],
         "response_to_profit": response_patterns["profit_response"],
@@ -0,0 +1,141 @@
+# benchmark.py - Microbenchmarks for the analytics pipeline
+print("Loading benchmark module...")
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+from synthetic_data import generate_csv
+from ingest import parse_trade_csv
+from database import transform_trade_data
+from derived_metrics import calculate_metrics
+from behavioral import analyze_behavior
+from chat import build_trader_context
+from trade_codec import encode_trades, decode_trades
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+RESULTS_DIR = "benchmarks"
+
+USER_DATA = {
+    "username": "bench",
+    "password": "bench",
+    "primary_strategy": "Technical",
+    "loss_reaction": "I cut my losses quickly",
+    "risk_tolerance": "Medium"
+}
+
+def build_stages(n, seed):
+    """Prepare inputs for every pipeline stage and return (name, fn) pairs"""
+    content = generate_csv(n, seed)
+    rows = parse_trade_csv(content)
+    trade_history = transform_trade_data(rows)
+    metrics = calculate_metrics(rows)
+    profile = analyze_behavior(metrics, USER_DATA)
+    user_responses = {k: USER_DATA[k] for k in ("primary_strategy", "loss_reaction", "risk_tolerance")}
+    encoded = encode_trades(trade_history)
+
+    return [
+        ("parse_trade_csv", lambda: parse_trade_csv(content)),
+        ("transform_trade_data", lambda: transform_trade_data(rows)),
+        ("encode_trades", lambda: encode_trades(trade_history)),
+        ("decode_trades", lambda: decode_trades(encoded)),
+        ("calculate_metrics", lambda: calculate_metrics(rows)),
+        ("analyze_behavior", lambda: analyze_behavior(metrics, USER_DATA)),
+        ("build_trader_context", lambda: build_trader_context(
+            profile["profile_features"], profile["derived_features"], trade_history, user_responses)),
+    ]
+
+def measure(fn, repeat):
+    """Time fn `repeat` times, then take one traced run for peak memory"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    # tracemalloc slows execution down, so peak memory gets its own run
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds_min": min(timings),
+        "seconds_median": statistics.median(timings),
+        "peak_memory_bytes": peak
+    }
+
+def git_revision():
+    """Current git revision, if available"""
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+def run_benchmarks(sizes, seed=42, repeat=3):
+    """Run every stage at every size and return a JSON-serialisable report"""
+    results = []
+    for n in sizes:
+        print(f"Benchmarking {n} trades...")
+        for stage, fn in build_stages(n, seed):
+            result = measure(fn, repeat)
+            result.update({"stage": stage, "rows": n})
+            results.append(result)
+            print(f"  {stage:<22} {result['seconds_min'] * 1000:10.2f} ms  "
+                  f"{result['peak_memory_bytes'] / 1e6:10.2f} MB")
+
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "repeat": repeat,
+        "results": results
+    }
+
+def compare_reports(baseline, current):
+    """Print time and memory ratios of current vs baseline for matching stages"""
+    previous = {(r["stage"], r["rows"]): r for r in baseline["results"]}
+    print(f"Comparing against {baseline.get('revision', 'baseline')}:")
+    for result in current["results"]:
+        before = previous.get((result["stage"], result["rows"]))
+        if not before:
+            continue
+        time_ratio = result["seconds_min"] / before["seconds_min"] if before["seconds_min"] else 0
+        memory_ratio = (result["peak_memory_bytes"] / before["peak_memory_bytes"]
+                        if before["peak_memory_bytes"] else 0)
+        print(f"  {result['stage']:<22} {result['rows']:>9}  time x{time_ratio:.2f}  memory x{memory_ratio:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the analytics pipeline on synthetic trades")
+    parser.add_argument("--sizes", type=float, nargs="+", default=DEFAULT_SIZES,
+                        help="Row counts to benchmark, e.g. 1e3 1e5 1e7")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Results file (default: benchmarks/<revision>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    report = run_benchmarks([int(n) for n in args.sizes], args.seed, args.repeat)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['revision']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_reports(json.load(f), report)
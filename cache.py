@@ -0,0 +1,124 @@
+# cache.py
+print("Loading cache module...")
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# Shared cache tier. "memory" keeps entries in this process (single worker and
+# tests); "sqlite" keeps them in a local SQLite file shared by every worker on
+# the host, so caches are not split N ways when serving with several workers.
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_PATH = os.environ.get("CACHE_PATH", ".cache.sqlite3")
+
+class MemoryCache:
+    """In-process cache with per-entry expiry; values are copied like the shared backends"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return default
+        return pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        """Set key only if it is absent or expired; returns whether it was set"""
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.time()):
+                return False
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (_, expires_at) in self._entries.items()
+                        if expires_at is not None and expires_at <= now]:
+                del self._entries[key]
+
+class SqliteCache:
+    """Cache in a local SQLite file (WAL mode), shared by every process on the host"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries "
+                         "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self._connection().execute(
+            "SELECT value FROM entries WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return pickle.loads(row[0]) if row else default
+
+    def set(self, key, value, ttl=None):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time() + ttl if ttl else None)
+        )
+
+    def add(self, key, value, ttl=None):
+        """Set key only if it is absent or expired; returns whether it was set"""
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO entries (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE entries.expires_at IS NOT NULL AND entries.expires_at <= ?",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + ttl if ttl else None, now)
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        self._connection().execute(
+            "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+
+def create_cache(backend=CACHE_BACKEND, path=CACHE_PATH):
+    """Cache for the configured backend"""
+    if backend == "memory":
+        return MemoryCache()
+    if backend == "sqlite":
+        return SqliteCache(path)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+shared_cache = create_cache()
+
+def cache_key(namespace, *parts):
+    """Key of an entry in a namespace; callers include the data_version their entry was built from"""
+    return ":".join([namespace] + [str(p) for p in parts])
+
+print(f"✓ Cache module loaded successfully ({CACHE_BACKEND})")
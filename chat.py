@@ -1,13 +1,25 @@
 # chat.py
 print("Loading chat module...")
 
+import asyncio
+import os
+import time
+import httpx
 import requests
 import json
 import random
 
+from tags import clean_tags, filters_mentioned, query_trade_index
+from generation import generation_options, strip_thinking
+
 # Ollama configuration
-OLLAMA_URL = "http://localhost:11434/api/generate"
-MODEL = "deepseek-r1:8b"  # Changed from llama3.2
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate")
+MODEL = os.environ.get("MODEL_NAME", "deepseek-r1:8b")  # Changed from llama3.2
+# Max concurrent upstream generations per worker (0 = unlimited); others wait for a slot
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "0"))
+
+_llm_slots = asyncio.Semaphore(LLM_CONCURRENCY) if LLM_CONCURRENCY > 0 else None
+_in_flight = 0
 
 def generate_response(user_message, trader_data):
     """Generate conversational response using Ollama LLM (non-streaming fallback)"""
@@ -40,12 +52,22 @@ def generate_response(user_message, trader_data):
         print(f"Ollama failed ({e}), using fallback response")
         return fallback_response(user_message, profile_features, trade_history)
 
-def build_trader_context(profile_features, derived_features, trade_history, user_responses):
+def build_trader_context(profile_features, derived_features, trade_history, user_responses,
+                         trade_index=None, user_message=None):
     """Build context about the trader for the LLM"""
     
     # Sample some recent trades for context
     recent_trades = trade_history[-5:] if len(trade_history) > 5 else trade_history
     
+    # Trades matching tags/assets/platforms/conditions mentioned in the question
+    relevant_trades, relevant_trade_count = [], 0
+    if trade_index and user_message:
+        filters = filters_mentioned(trade_index, user_message)
+        if filters:
+            positions = query_trade_index(trade_index, filters)
+            relevant_trade_count = len(positions)
+            relevant_trades = [trade_history[i] for i in positions[-5:]]
+    
     context = {
         "persona": derived_features.get("persona_label", "systematic trader"),
         "trading_style": profile_features.get("style", "Technical"),
@@ -57,7 +79,9 @@ def build_trader_context(profile_features, derived_features, trade_history, user
         "recent_trades": recent_trades,
         "total_trades": len(trade_history),
         "holding_period": profile_features.get("holding_period", "Swing"),
-        "volatility_preference": profile_features.get("volatility_preference", "stable")
+        "volatility_preference": profile_features.get("volatility_preference", "stable"),
+        "relevant_trades": relevant_trades,
+        "relevant_trade_count": relevant_trade_count
     }
     
     return context
@@ -85,7 +109,7 @@ Your Trading Philosophy:
 
 Some of your recent trades:
 {format_recent_trades(context['recent_trades'])}
-
+{format_relevant_trades(context)}
 User Question: {user_message}
 
 Respond as the trader in first person, being conversational and specific about your trading decisions and philosophy. 
@@ -105,61 +129,157 @@ def format_recent_trades(trades):
     
     return "\n".join(formatted)
 
+def format_relevant_trades(context):
+    """Format trades matching the question for the prompt, if any"""
+    if not context.get("relevant_trades"):
+        return ""
+    return (f"\nTrades related to this question ({context['relevant_trade_count']} in total, latest shown):\n"
+            f"{format_recent_trades(context['relevant_trades'])}\n")
+
 def call_ollama_non_streaming(prompt):
     """Call Ollama API to generate non-streaming response"""
-    payload = {
-        "model": MODEL,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.1,
-            "max_tokens": 200,
-            "think": True
-        }
-    }
-    
-    response = requests.post(OLLAMA_URL, json=payload, timeout=None)
+    response = requests.post(OLLAMA_URL, json=chat_payload(prompt, stream=False), timeout=None)
     
     if response.status_code == 200:
         result = response.json()
-        return result.get("response", "I'm having trouble expressing my thoughts right now.")
+        answer = strip_thinking(result.get("response", ""))
+        return answer or "I'm having trouble expressing my thoughts right now."
     else:
         raise Exception(f"Ollama API error: {response.status_code}")
 
+def chat_payload(prompt, stream=True, model=MODEL, think=None):
+    """Ollama generate request for a chat prompt; think=None uses the generation policy"""
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": stream
+    }
+    payload.update(generation_options() if think is None else generation_options(think))
+    return payload
+
+_async_client = None
+
+def get_async_client():
+    """Shared async HTTP client for streaming from Ollama (connection pooling)"""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(timeout=httpx.Timeout(None, connect=10.0))
+    return _async_client
+
+def llm_in_flight():
+    """Upstream generations currently holding a slot in this worker"""
+    return _in_flight
+
+async def stream_ollama(payload, timings=None):
+    """Stream Ollama's NDJSON chunks as dicts; records slot wait and connect time in timings.
+
+    Closing or cancelling the generator closes the upstream connection, which
+    makes Ollama stop generating, and releases the slot.
+    """
+    global _in_flight
+    started = time.perf_counter()
+    if _llm_slots is not None:
+        await _llm_slots.acquire()
+    _in_flight += 1
+    try:
+        if timings is not None:
+            timings["slot_wait_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        started = time.perf_counter()
+        async with get_async_client().stream("POST", OLLAMA_URL, json=payload) as response:
+            if timings is not None:
+                timings["upstream_connect_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            if response.status_code != 200:
+                raise Exception(f"Ollama API error: {response.status_code}")
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    finally:
+        _in_flight -= 1
+        if _llm_slots is not None:
+            _llm_slots.release()
+
+# Common question intents and the words that identify them, checked in order
+INTENT_KEYWORDS = [
+    ("strategy", ["strategy", "approach", "method"]),
+    ("losses", ["loss", "losses", "losing"]),
+    ("tokens", ["token", "coin", "crypto", "prefer"]),
+    ("buys", ["buy", "bought", "purchase"]),
+    ("sells", ["sell", "sold", "exit"]),
+    ("risk", ["risk", "risky", "safe"])
+]
+
+# A representative question per intent, used to precompute answers
+CANONICAL_QUESTIONS = {
+    "strategy": "What is your trading strategy?",
+    "losses": "How do you handle losses?",
+    "tokens": "Which tokens do you prefer to trade?",
+    "buys": "Tell me about one of your recent buys.",
+    "sells": "Tell me about one of your recent sells.",
+    "risk": "How much risk are you comfortable taking?"
+}
+
+def classify_intent(user_message):
+    """The common question intent a message matches, or None"""
+    message_lower = user_message.lower()
+    for intent, words in INTENT_KEYWORDS:
+        if any(word in message_lower for word in words):
+            return intent
+    return None
+
+def specific_filters(trade_index, user_message, intent=None):
+    """Trade filters a message mentions beyond its intent's own words.
+
+    The intent keywords ("losses", "buys") name trade values too, which
+    doesn't make a question about particular trades.
+    """
+    filters = filters_mentioned(trade_index, user_message) if trade_index else {}
+    own_words = dict(INTENT_KEYWORDS).get(intent, [])
+    specific = {}
+    for field, values in filters.items():
+        values = [value for value in values if value not in own_words]
+        if values:
+            specific[field] = values
+    return specific
+
 def fallback_response(user_message, profile_features, trade_history):
     """Fallback rule-based response when LLM is unavailable"""
     
-    message_lower = user_message.lower()
-    
     # Response templates based on common questions
-    if any(word in message_lower for word in ["strategy", "approach", "method"]):
+    intent = classify_intent(user_message)
+    if intent == "strategy":
         style = profile_features.get("style", "Technical")
         strategies = profile_features.get("common_strategies", ["technical analysis"])
         return f"My primary trading style is {style}. I typically use {', '.join(strategies[:2])} as my main strategies. I've found this approach works well with my {profile_features.get('risk_appetite', 'medium').lower()} risk tolerance."
     
-    elif any(word in message_lower for word in ["loss", "losses", "losing"]):
+    elif intent == "losses":
         loss_response = profile_features.get("response_to_loss", "analytical")
         return f"When I face losses, I tend to be {loss_response}. It's part of trading - I've learned that managing losses is just as important as capturing gains. My current win rate is {profile_features.get('win_rate', 0):.1%}."
     
-    elif any(word in message_lower for word in ["token", "coin", "crypto", "prefer"]):
+    elif intent == "tokens":
         preferred = profile_features.get("preferred_tokens", ["BTC", "ETH"])
         return f"I tend to focus on {', '.join(preferred[:3])} based on my trading history. These tokens align well with my {profile_features.get('style', 'technical').lower()} approach and {profile_features.get('volatility_preference', 'stable')} market preference."
     
-    elif any(word in message_lower for word in ["buy", "bought", "purchase"]):
+    elif intent == "buys":
         recent_buys = [t for t in trade_history[-10:] if t.get("action") == "Buy"]
         if recent_buys:
             recent = recent_buys[-1]
-            return f"One of my recent buys was {recent.get('asset')} at ${recent.get('price', 0):.2f}. I entered because of {recent.get('tags', ['market conditions'])[0]} - it turned out to be a {recent.get('outcome', 'learning experience').lower()}."
+            reason = recent.get('entry_reason') or next(iter(clean_tags(recent.get('tags'))), 'market conditions')
+            return f"One of my recent buys was {recent.get('asset')} at ${recent.get('price', 0):.2f}. I entered because of {reason} - it turned out to be a {(recent.get('outcome') or 'learning experience').lower()}."
         return "I look for good entry points based on my technical analysis and market sentiment alignment."
     
-    elif any(word in message_lower for word in ["sell", "sold", "exit"]):
+    elif intent == "sells":
         recent_sells = [t for t in trade_history[-10:] if t.get("action") == "Sell"]
         if recent_sells:
             recent = recent_sells[-1]
-            return f"Recently sold {recent.get('asset')} at ${recent.get('price', 0):.2f}. My exit was driven by {recent.get('tags', ['profit taking'])[0]} - ended up being a {recent.get('outcome', 'neutral').lower()}."
+            reason = recent.get('exit_reason') or next(iter(clean_tags(recent.get('tags'))), 'profit taking')
+            return f"Recently sold {recent.get('asset')} at ${recent.get('price', 0):.2f}. My exit was driven by {reason} - ended up being a {(recent.get('outcome') or 'neutral').lower()}."
         return "I typically exit positions based on my predetermined targets or when market conditions change."
     
-    elif any(word in message_lower for word in ["risk", "risky", "safe"]):
+    elif intent == "risk":
         risk_appetite = profile_features.get("risk_appetite", "Medium")
         return f"I'd describe myself as having a {risk_appetite.lower()} risk appetite. I use {profile_features.get('portfolio_diversification', 'moderate').lower()} diversification and typically hold positions for {profile_features.get('holding_period', 'swing').lower()} periods."
     
@@ -0,0 +1,16 @@
+# conftest.py - Shared fixtures
+import csv
+import os
+
+import pytest
+
+from database import transform_trade_data
+from tags import build_trade_index
+
+SAMPLE_CSV = os.path.join(os.path.dirname(__file__), "user-001.csv")
+
+@pytest.fixture(scope="session")
+def trade_index():
+    """Trade index of the sample trader history"""
+    with open(SAMPLE_CSV, newline="") as f:
+        return build_trade_index(transform_trade_data(list(csv.DictReader(f))))
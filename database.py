@@ -2,43 +2,55 @@
 print("Loading database module...")
 
 try:
-    from pymongo import MongoClient
+    from pymongo import MongoClient, UpdateOne
     print("✓ PyMongo imported successfully")
 except ImportError as e:
     print(f"✗ Error importing PyMongo: {e}")
     print("Please install pymongo: pip install pymongo")
     exit(1)
 
+import os
 import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from trade_codec import encode_trades, decode_trades
+from snapshot import load_snapshot, schedule_snapshot
+from profiles import is_stale, recompute_analysis
+from cache import shared_cache
+from rollups import build_rollups, activity_histogram, bucket_of, plan_range_buckets, combine_rollups
+from export import EXPORT_BATCH_SIZE, SORT_FIELDS, sort_key, matches_filters
+
+MONGODB_URL = os.environ.get("MONGODB_URL", "mongodb://localhost:27017/")
+
+# "documents" stores one subdocument per trade; "compact" stores the history
+# column-oriented with dictionary-encoded categoricals (see trade_codec.py)
+TRADE_STORAGE = os.environ.get("TRADE_STORAGE", "documents")
+
+# Background write-back of profiles recomputed on read; a shared lease keeps
+# workers from writing back the same trader at once
+_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profile-refresh")
+REFRESH_LEASE_SECONDS = 60
+
 # Global MongoDB connection
 try:
-    client = MongoClient("mongodb://localhost:27017/")
+    client = MongoClient(MONGODB_URL)
     db = client["trade_agent_db"]
     traders_collection = db["traders"]
     users_collection = db["users"]
+    rollups_collection = db["trade_rollups"]
+    fingerprints_collection = db["trade_fingerprints"]
+    uploads_collection = db["uploads"]
     print("✓ MongoDB connection established")
 except Exception as e:
     print(f"Warning: MongoDB connection failed: {e}")
     print("Make sure MongoDB is running on localhost:27017")
 
-def store_user_data(user_data, trade_data):
-    """Store user registration data and trade history"""
-    print(f"Storing user data for: {user_data['username']}")
-    print(f"Trade data type: {type(trade_data)}")
-    print(f"Trade data length: {len(trade_data) if hasattr(trade_data, '__len__') else 'N/A'}")
-    
-    if not isinstance(trade_data, list):
-        raise ValueError(f"Expected list, got {type(trade_data)}")
-    
-    trader_id = str(uuid.uuid4())
-    
-    # Transform trade data to match the desired schema
+def transform_trade_data(trade_data):
+    """Transform raw trade rows to match the stored trade schema"""
     trade_history = []
     for i, trade in enumerate(trade_data):
-        print(f"Processing trade {i+1}: {type(trade)}")
-        
         if not isinstance(trade, dict):
             raise ValueError(f"Trade {i+1} is not a dictionary: {type(trade)}")
         
@@ -69,17 +81,28 @@ def store_user_data(user_data, trade_data):
         }
         trade_history.append(transformed_trade)
     
-    trader_document = {
-        "trader_id": trader_id,
-        "username": user_data["username"],
-        "trade_history": trade_history,
-        "user_responses": {
-            "primary_strategy": user_data["primary_strategy"],
-            "loss_reaction": user_data["loss_reaction"],
-            "risk_tolerance": user_data["risk_tolerance"]
-        },
-        "created_at": datetime.now()
-    }
+    return trade_history
+
+# Stored trade field -> CSV column, for fields renamed by transform_trade_data
+STORED_TO_CSV_FIELDS = {"date": "trade_date", "outcome": "trade_outcome"}
+
+def restore_trade_rows(trade_history):
+    """Convert stored trades back to the CSV row format the metrics agents read"""
+    return [{STORED_TO_CSV_FIELDS.get(k, k): v for k, v in trade.items()} for trade in trade_history]
+
+def store_user_data(user_data, trade_data):
+    """Store user registration data and trade history"""
+    print(f"Storing user data for: {user_data['username']}")
+    print(f"Trade data type: {type(trade_data)}")
+    print(f"Trade data length: {len(trade_data) if hasattr(trade_data, '__len__') else 'N/A'}")
+    
+    if not isinstance(trade_data, list):
+        raise ValueError(f"Expected list, got {type(trade_data)}")
+    
+    trader_id = str(uuid.uuid4())
+    trade_history = transform_trade_data(trade_data)
+    
+    trader_document = build_trader_document(trader_id, user_data, trade_history)
     
     try:
         # Store user credentials separately
@@ -96,6 +119,81 @@ def store_user_data(user_data, trade_data):
         print(f"✗ Error storing user data: {e}")
         raise
 
+def user_responses_of(user_data):
+    """The questionnaire answers stored alongside a trader"""
+    return {
+        "primary_strategy": user_data["primary_strategy"],
+        "loss_reaction": user_data["loss_reaction"],
+        "risk_tolerance": user_data["risk_tolerance"]
+    }
+
+def build_trader_document(trader_id, user_data, trade_history):
+    """Assemble the trader document stored in the traders collection"""
+    trader_document = {
+        "trader_id": trader_id,
+        "username": user_data["username"],
+        "user_responses": user_responses_of(user_data),
+        "created_at": datetime.now(),
+        # Bumped on every write; local snapshots are only valid for the version they captured
+        "data_version": 1
+    }
+    trader_document.update(encode_trade_history(trade_history))
+    trader_document["trade_summary"] = summarize_trades(trade_history)
+    return trader_document
+
+def summarize_trades(trade_history):
+    """Small per-trader summary that population aggregations group over"""
+    total_trades = len(trade_history)
+    profitable_trades = 0
+    asset_counts = Counter()
+    for trade in trade_history:
+        if trade.get("outcome") == "Profit":
+            profitable_trades += 1
+        if trade.get("asset"):
+            asset_counts[trade["asset"]] += 1
+    return {
+        "total_trades": total_trades,
+        "profitable_trades": profitable_trades,
+        "win_rate": profitable_trades / total_trades if total_trades > 0 else 0,
+        "asset_counts": [{"asset": asset, "count": count} for asset, count in asset_counts.most_common()]
+    }
+
+def encode_trade_history(trade_history):
+    """Trade history fields to store, in the configured storage format"""
+    if TRADE_STORAGE == "compact":
+        return {"trade_columns": encode_trades(trade_history), "trade_count": len(trade_history)}
+    return {"trade_history": trade_history, "trade_count": len(trade_history)}
+
+def decode_trader(trader):
+    """Expose compact trade storage as a regular trade_history list"""
+    if trader and "trade_columns" in trader:
+        trader["trade_history"] = decode_trades(trader.pop("trade_columns"))
+    return trader
+
+def store_trader(user_data, trade_history, metrics, profile, analysis_stamp=None):
+    """Store a fully processed trader (trades, metrics and profile) in a single write"""
+    print(f"Storing trader for: {user_data['username']} ({len(trade_history)} trades)")
+    trader_id = str(uuid.uuid4())
+    trader_document = build_trader_document(trader_id, user_data, trade_history)
+    trader_document["derived_metrics"] = metrics
+    trader_document["behavioral_profile"] = profile
+    trader_document["analysis_stamp"] = analysis_stamp
+    
+    try:
+        traders_collection.insert_one(trader_document)
+        
+        # Credentials go in last so a login never finds a half-registered trader
+        users_collection.insert_one({
+            "username": user_data["username"],
+            "password": user_data["password"],
+            "trader_id": trader_id
+        })
+        print(f"✓ Trader stored successfully with trader_id: {trader_id}")
+        return trader_id
+    except Exception as e:
+        print(f"✗ Error storing trader: {e}")
+        raise
+
 def authenticate_user(username, password):
     """Authenticate user and return trader data"""
     print(f"Authenticating user: {username}")
@@ -119,7 +217,7 @@ def store_derived_metrics(trader_id, metrics):
     try:
         traders_collection.update_one(
             {"trader_id": trader_id},
-            {"$set": {"derived_metrics": metrics}}
+            {"$set": {"derived_metrics": metrics}, "$inc": {"data_version": 1}}
         )
         print("✓ Derived metrics stored successfully")
     except Exception as e:
@@ -132,20 +230,70 @@ def store_behavioral_profile(trader_id, profile):
     try:
         traders_collection.update_one(
             {"trader_id": trader_id},
-            {"$set": {"behavioral_profile": profile}}
+            {"$set": {"behavioral_profile": profile}, "$inc": {"data_version": 1}}
         )
         print("✓ Behavioral profile stored successfully")
     except Exception as e:
         print(f"✗ Error storing behavioral profile: {e}")
         raise
 
-def get_trader_profile(trader_id):
-    """Retrieve complete trader profile"""
+def store_refreshed_analysis(trader_id, data_version, metrics, profile, stamp, trade_summary):
+    """Write back a recomputed profile, unless the trader changed since it was read"""
+    try:
+        result = traders_collection.update_one(
+            {"trader_id": trader_id, "data_version": data_version},
+            {"$set": {
+                "derived_metrics": metrics,
+                "behavioral_profile": profile,
+                "analysis_stamp": stamp,
+                "trade_summary": trade_summary
+            }, "$inc": {"data_version": 1}}
+        )
+        if result.modified_count:
+            print(f"✓ Refreshed profile stored for trader: {trader_id}")
+    except Exception as e:
+        print(f"✗ Error storing refreshed profile: {e}")
+    finally:
+        shared_cache.delete(f"profile-refresh:{trader_id}")
+
+def refresh_stale_analysis(trader):
+    """Recompute an outdated profile for this read and write it back in the background"""
+    trade_history = trader.get("trade_history", [])
+    metrics, profile, stamp = recompute_analysis(restore_trade_rows(trade_history), trader.get("user_responses", {}))
+    trader_id = trader["trader_id"]
+    if shared_cache.add(f"profile-refresh:{trader_id}", os.getpid(), ttl=REFRESH_LEASE_SECONDS):
+        _refresh_executor.submit(store_refreshed_analysis, trader_id, trader.get("data_version", 0),
+                                 metrics, profile, stamp, summarize_trades(trade_history))
+    
+    trader = dict(trader)
+    trader.update({"derived_metrics": metrics, "behavioral_profile": profile, "analysis_stamp": stamp})
+    print(f"✓ Recomputed stale profile for trader: {trader_id}")
+    return trader
+
+def get_trader_profile(trader_id, refresh=True):
+    """Retrieve complete trader profile, recomputing it if the analysis rules changed (unless refresh=False)"""
+    trader = _load_trader(trader_id)
+    if refresh and trader and is_stale(trader):
+        trader = refresh_stale_analysis(trader)
+    return trader
+
+def _load_trader(trader_id):
     print(f"Retrieving trader profile: {trader_id}")
     try:
-        trader = traders_collection.find_one({"trader_id": trader_id})
+        # A local snapshot at the current data_version avoids fetching and decoding the document
+        version = traders_collection.find_one({"trader_id": trader_id}, {"data_version": 1, "_id": 0})
+        if version is None:
+            print("✗ Trader profile not found")
+            return None
+        trader = load_snapshot(trader_id, version.get("data_version", 0))
+        if trader:
+            print("✓ Trader profile loaded from snapshot")
+            return trader
+        
+        trader = decode_trader(traders_collection.find_one({"trader_id": trader_id}))
         if trader:
             print("✓ Trader profile retrieved successfully")
+            schedule_snapshot(trader)
         else:
             print("✗ Trader profile not found")
         return trader
@@ -155,21 +303,249 @@ def get_trader_profile(trader_id):
 
 def get_trade_history(trader_id):
     """Get trader's trade history"""
-    trader = traders_collection.find_one({"trader_id": trader_id})
+    trader = decode_trader(traders_collection.find_one(
+        {"trader_id": trader_id}, {"trade_history": 1, "trade_columns": 1}
+    ))
     return trader.get("trade_history", []) if trader else []
 
-def get_trader_stats(trader_id):
-    """Get trader statistics"""
-    trader = traders_collection.find_one({"trader_id": trader_id})
+def _after_condition(after):
+    """Keyset condition for trades sorting after (date, trade_id); missing values sort first"""
+    date, trade_id = after
+    later_date = {"date": {"$ne": None}} if date is None else {"date": {"$gt": date}}
+    later_id = {"trade_id": {"$ne": None}} if trade_id is None else {"trade_id": {"$gt": trade_id}}
+    return {"$or": [later_date, {"date": date, **later_id}]}
+
+def _export_match(filters, after):
+    conditions = [{field: filters[field]} for field in ("asset", "outcome") if field in filters]
+    if "date_from" in filters:
+        conditions.append({"date": {"$gte": filters["date_from"]}})
+    if "date_before" in filters:
+        conditions.append({"date": {"$lt": filters["date_before"]}})
+    if after is not None:
+        conditions.append(_after_condition(after))
+    return {"$and": conditions} if conditions else None
+
+def export_trades(trader_id, fields, filters=None, after=None, limit=None):
+    """Iterator over a trader's trades in (date, trade_id) order, or None if the trader doesn't exist.
+
+    Trades stored as documents are unwound, filtered, sorted and projected by
+    MongoDB and read from the cursor in batches (allowDiskUse lets large
+    histories sort on disk). Compact histories can only be decoded whole, so
+    they are filtered and sorted here.
+    """
+    filters = filters or {}
+    trader = traders_collection.find_one({"trader_id": trader_id}, {"_id": 1, "trade_columns.encoding": 1})
     if not trader:
         return None
-    
-    trades = trader.get("trade_history", [])
-    if not trades:
+
+    if "trade_columns" in trader:
+        trades = decode_trader(traders_collection.find_one(
+            {"trader_id": trader_id}, {"trade_columns": 1}
+        )).get("trade_history", [])
+        selected = sorted((t for t in trades if matches_filters(t, filters, after)), key=sort_key)
+        return ({field: trade.get(field) for field in fields} for trade in selected[:limit])
+
+    pipeline = [
+        {"$match": {"trader_id": trader_id}},
+        {"$project": {"_id": 0, "trade_history": 1}},
+        {"$unwind": "$trade_history"},
+        {"$replaceRoot": {"newRoot": "$trade_history"}}
+    ]
+    match = _export_match(filters, after)
+    if match:
+        pipeline.append({"$match": match})
+    pipeline.append({"$sort": {field: 1 for field in SORT_FIELDS}})
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline.append({"$project": {"_id": 0, **{field: 1 for field in fields}}})
+    return traders_collection.aggregate(pipeline, allowDiskUse=True, batchSize=EXPORT_BATCH_SIZE)
+
+def ensure_indexes():
+    """Create the indexes that lookups, upload checks and population aggregations rely on; run at startup"""
+    traders_collection.create_index("trader_id", unique=True)
+    traders_collection.create_index("behavioral_profile.derived_features.persona_label")
+    traders_collection.create_index("trade_summary.win_rate")
+    users_collection.create_index("username")
+    rollups_collection.create_index(
+        [("trader_id", 1), ("granularity", 1), ("bucket", 1), ("asset", 1)], unique=True
+    )
+    fingerprints_collection.create_index([("trader_id", 1), ("key", 1)], unique=True)
+    uploads_collection.create_index([("trader_id", 1), ("file_hash", 1)], unique=True)
+    print("✓ MongoDB indexes ensured")
+
+def find_user_trader(username, password):
+    """trader_id already registered under these credentials, or None"""
+    user = users_collection.find_one({"username": username, "password": password}, {"trader_id": 1})
+    return user["trader_id"] if user else None
+
+def get_trader_state(trader_id):
+    """The small part of a trader document a re-upload is checked against"""
+    return traders_collection.find_one({"trader_id": trader_id}, {
+        "_id": 0, "trade_count": 1, "data_version": 1, "user_responses": 1, "analysis_stamp": 1
+    })
+
+def find_upload(trader_id, file_hash):
+    """Earlier upload of the same file by this trader, or None"""
+    return uploads_collection.find_one({"trader_id": trader_id, "file_hash": file_hash}, {"_id": 0})
+
+def record_upload(trader_id, file_hash, summary):
+    """Remember an uploaded file by its content hash"""
+    uploads_collection.update_one(
+        {"trader_id": trader_id, "file_hash": file_hash},
+        {"$set": dict(summary, uploaded_at=datetime.now()), "$inc": {"upload_count": 1}},
+        upsert=True
+    )
+
+def get_trade_fingerprints(trader_id):
+    """{trade key: content hash} of a trader's stored trades"""
+    cursor = fingerprints_collection.find({"trader_id": trader_id}, {"_id": 0, "key": 1, "hash": 1})
+    return {doc["key"]: doc["hash"] for doc in cursor.batch_size(10000)}
+
+def store_trade_fingerprints(trader_id, added, changed=None, batch_size=10000):
+    """Insert fingerprints of new trades and update those of changed ones ({key: hash} each)"""
+    documents = [{"trader_id": trader_id, "key": key, "hash": value} for key, value in added.items()]
+    for start in range(0, len(documents), batch_size):
+        fingerprints_collection.insert_many(documents[start:start + batch_size], ordered=False)
+    operations = [UpdateOne({"trader_id": trader_id, "key": key}, {"$set": {"hash": value}})
+                  for key, value in (changed or {}).items()]
+    for start in range(0, len(operations), batch_size):
+        fingerprints_collection.bulk_write(operations[start:start + batch_size], ordered=False)
+
+def store_resynced_trader(trader_id, data_version, trade_history, metrics, profile, stamp, user_responses):
+    """Write a re-uploaded trader's merged history and analysis, unless it changed since it was read"""
+    update = encode_trade_history(trade_history)
+    update.update({
+        "user_responses": user_responses,
+        "derived_metrics": metrics,
+        "behavioral_profile": profile,
+        "analysis_stamp": stamp,
+        "trade_summary": summarize_trades(trade_history)
+    })
+    # The other storage format's field is dropped so decode_trader sees the new history
+    unset = {"trade_history" if "trade_columns" in update else "trade_columns": ""}
+    result = traders_collection.update_one(
+        {"trader_id": trader_id, "data_version": data_version},
+        {"$set": update, "$unset": unset, "$inc": {"data_version": 1}}
+    )
+    if not result.modified_count:
+        raise RuntimeError("Trader was updated during the upload, please try again")
+    print(f"✓ Trader re-synced: {trader_id} ({len(trade_history)} trades)")
+
+def store_trade_rollups(trader_id, trades, sign=1):
+    """Add a batch of trades to the trader's materialized rollups and activity histogram (sign=-1 removes them)"""
+    operations = [
+        UpdateOne(
+            {"trader_id": trader_id, "granularity": granularity, "bucket": bucket, "asset": asset},
+            {"$inc": {field: sign * value for field, value in totals.items()}},
+            upsert=True
+        )
+        for (granularity, bucket, asset), totals in build_rollups(trades).items()
+    ]
+    cells = {f"cells.{weekday}.{hour}": sign * count
+             for weekday, hours in activity_histogram(trades).items() for hour, count in hours.items()}
+    if cells:
+        operations.append(UpdateOne(
+            {"trader_id": trader_id, "granularity": "activity", "bucket": "all", "asset": "*"},
+            {"$inc": cells},
+            upsert=True
+        ))
+    if not operations:
+        return
+    # Errors propagate: a lost increment would leave the rollups wrong for good
+    rollups_collection.bulk_write(operations, ordered=False)
+    print(f"✓ Rollups updated for trader: {trader_id} ({len(operations)} buckets)")
+
+def build_trade_rollups(trader_id, trades):
+    """Materialize a trader's rollups from the full history; nothing is kept if the write fails"""
+    try:
+        store_trade_rollups(trader_id, trades)
+    except Exception:
+        # Partial rollups would stop ensure_trade_rollups from backfilling later
+        rollups_collection.delete_many({"trader_id": trader_id})
+        raise
+
+def ensure_trade_rollups(trader):
+    """Materialize rollups for traders registered before rollups existed"""
+    trader_id = trader["trader_id"]
+    if rollups_collection.find_one({"trader_id": trader_id}, {"_id": 1}):
+        return
+    # The lease outlives the backfill so no two workers add the same trades twice
+    lease = f"rollups-backfill:{trader_id}"
+    if shared_cache.add(lease, os.getpid(), ttl=3600):
+        try:
+            build_trade_rollups(trader_id, trader.get("trade_history", []))
+        except Exception:
+            # Released so the next read can try again
+            shared_cache.delete(lease)
+            raise
+
+def get_rollup_series(trader_id, granularity, start=None, end=None, asset=None):
+    """Per-bucket totals over time (all assets combined unless one is given)"""
+    match = {"trader_id": trader_id, "granularity": granularity}
+    if asset:
+        match["asset"] = asset
+    if start or end:
+        match["bucket"] = {}
+        if start:
+            match["bucket"]["$gte"] = bucket_of(start, granularity)
+        if end:
+            match["bucket"]["$lte"] = bucket_of(end, granularity)
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": "$bucket",
+            "count": {"$sum": "$count"},
+            "wins": {"$sum": "$wins"},
+            "notional": {"$sum": "$notional"},
+            "duration_total": {"$sum": "$duration_total"},
+            "duration_count": {"$sum": "$duration_count"}
+        }},
+        {"$sort": {"_id": 1}}
+    ]
+    return [dict(combine_rollups([row]), bucket=row["_id"]) for row in rollups_collection.aggregate(pipeline)]
+
+def get_range_metrics(trader_id, start, end, asset=None):
+    """Metrics for trades dated within [start, end], read from whole-month and edge-day rollups"""
+    buckets = plan_range_buckets(start, end)
+    query = {"trader_id": trader_id, "$or": [
+        {"granularity": granularity, "bucket": {"$in": labels}}
+        for granularity, labels in buckets.items() if labels
+    ]}
+    if not query["$or"]:
+        return dict(combine_rollups([]), buckets_read=0)
+    if asset:
+        query["asset"] = asset
+    rows = list(rollups_collection.find(query, {"_id": 0, "count": 1, "wins": 1, "notional": 1,
+                                                "duration_total": 1, "duration_count": 1}))
+    return dict(combine_rollups(rows), buckets_read=len(rows))
+
+def get_activity_histogram(trader_id):
+    """Stored day-of-week x hour-of-day trade counts"""
+    doc = rollups_collection.find_one(
+        {"trader_id": trader_id, "granularity": "activity", "bucket": "all", "asset": "*"}, {"cells": 1}
+    )
+    return doc.get("cells", {}) if doc else {}
+
+def get_trader_stats(trader_id):
+    """Get trader statistics"""
+    # Counted inside MongoDB; older documents without a trade_summary fall back to the array
+    trades = {"$ifNull": ["$trade_history", []]}
+    pipeline = [
+        {"$match": {"trader_id": trader_id}},
+        {"$project": {
+            "_id": 0,
+            "total_trades": {"$ifNull": ["$trade_summary.total_trades", {"$size": trades}]},
+            "profitable_trades": {"$ifNull": ["$trade_summary.profitable_trades", {"$size": {
+                "$filter": {"input": trades, "as": "t", "cond": {"$eq": ["$$t.outcome", "Profit"]}}
+            }}]}
+        }}
+    ]
+    result = next(traders_collection.aggregate(pipeline), None)
+    if not result or not result["total_trades"]:
         return None
     
-    total_trades = len(trades)
-    profitable_trades = len([t for t in trades if t["outcome"] == "Profit"])
+    total_trades = result["total_trades"]
+    profitable_trades = result["profitable_trades"]
     win_rate = profitable_trades / total_trades if total_trades > 0 else 0
     
     return {
@@ -179,4 +555,53 @@ def get_trader_stats(trader_id):
         "loss_trades": total_trades - profitable_trades
     }
 
+def get_population_totals():
+    """Trader, trade and win counts across all traders"""
+    pipeline = [
+        {"$group": {
+            "_id": None,
+            "traders": {"$sum": 1},
+            "total_trades": {"$sum": {"$ifNull": ["$trade_summary.total_trades", "$derived_metrics.trade_frequency"]}},
+            "profitable_trades": {"$sum": "$trade_summary.profitable_trades"}
+        }},
+        {"$project": {"_id": 0}}
+    ]
+    return next(traders_collection.aggregate(pipeline), {"traders": 0, "total_trades": 0, "profitable_trades": 0})
+
+def get_win_rate_distribution(bucket_count=10):
+    """Number of traders per win-rate bucket"""
+    boundaries = [round(i / bucket_count, 4) for i in range(bucket_count)] + [1.0001]
+    pipeline = [
+        {"$bucket": {
+            "groupBy": {"$ifNull": ["$trade_summary.win_rate", "$derived_metrics.win_rate"]},
+            "boundaries": boundaries,
+            "default": "unknown",
+            "output": {"traders": {"$sum": 1}}
+        }}
+    ]
+    return [{"min_win_rate": b["_id"], "traders": b["traders"]} for b in traders_collection.aggregate(pipeline)]
+
+def get_top_assets(limit=10):
+    """Most-traded assets across all traders"""
+    pipeline = [
+        {"$unwind": "$trade_summary.asset_counts"},
+        {"$group": {
+            "_id": "$trade_summary.asset_counts.asset",
+            "trades": {"$sum": "$trade_summary.asset_counts.count"},
+            "traders": {"$sum": 1}
+        }},
+        {"$sort": {"trades": -1}},
+        {"$limit": limit}
+    ]
+    return [{"asset": a["_id"], "trades": a["trades"], "traders": a["traders"]}
+            for a in traders_collection.aggregate(pipeline)]
+
+def get_persona_counts():
+    """Number of traders per persona label"""
+    pipeline = [
+        {"$group": {"_id": "$behavioral_profile.derived_features.persona_label", "traders": {"$sum": 1}}},
+        {"$sort": {"traders": -1}}
+    ]
+    return [{"persona_label": p["_id"], "traders": p["traders"]} for p in traders_collection.aggregate(pipeline)]
+
 print("✓ Database module loaded successfully")
\ No newline at end of file
@@ -5,6 +5,12 @@ from collections import Counter
 import statistics
 from datetime import datetime
 
+from rollups import activity_histogram, describe_active_hours
+
+# Bump whenever calculate_metrics or behavioral.analyze_behavior change what they
+# produce; stored profiles from older versions are recomputed lazily on read
+ANALYTICS_VERSION = 2
+
 def calculate_metrics(trade_data):
     """Calculate derived metrics from raw trade data"""
     print(f"Calculating metrics for {len(trade_data)} trades")
@@ -32,7 +38,7 @@ def calculate_metrics(trade_data):
     max_trade_size = max(trade_values) if trade_values else 0
     
     # Time analysis
-    durations = [int(t.get("trade_duration", 0)) for t in trade_data if t.get("trade_duration")]
+    durations = [int(t.get("trade_duration")) for t in trade_data if t.get("trade_duration") not in (None, "")]
     avg_holding_time = statistics.mean(durations) if durations else 0
     
     # Determine holding period category
@@ -43,6 +49,9 @@ def calculate_metrics(trade_data):
     else:
         holding_period = "Long-term"
     
+    # When the trader is active, from time_of_trade and day_of_week
+    active_hours = describe_active_hours(activity_histogram(trade_data))
+    
     # Market condition analysis
     market_conditions = [t.get("market_condition") for t in trade_data if t.get("market_condition")]
     bullish_trades = len([c for c in market_conditions if c == "Bullish"])
@@ -87,6 +96,7 @@ def calculate_metrics(trade_data):
         "portfolio_diversification": portfolio_diversification,
         "risk_appetite": risk_appetite,
         "holding_period": holding_period,
+        "active_hours": active_hours,
         "market_sentiment_alignment": round(market_sentiment_alignment, 3),
         "technical_indicator_usage": round(technical_indicator_usage, 3),
         "news_sensitivity": round(news_sensitivity, 3),
@@ -0,0 +1,130 @@
+# export.py
+print("Loading export module...")
+
+import base64
+import csv
+import io
+import json
+from datetime import timedelta
+
+from trade_codec import FIELD_ORDER
+
+# Trade history export: trades stream in (date, trade_id) order straight from
+# the database cursor, a chunk of rows at a time, so memory stays constant
+# however long the history is
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_BATCH_SIZE = 1000   # rows per database round trip
+CHUNK_ROWS = 500           # rows per chunk written to the response
+
+# Keyset of an export; always exported so any row can be resumed after
+SORT_FIELDS = ["date", "trade_id"]
+
+# Last line of a CSV page cut off at its limit, followed by the continuation token
+CSV_CURSOR_PREFIX = "# next_cursor="
+
+def encode_cursor(trade):
+    """Continuation token resuming an export after this trade"""
+    key = json.dumps([trade.get(field) for field in SORT_FIELDS], default=str)
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+def decode_cursor(token):
+    """(date, trade_id) of the last exported trade from a continuation token"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, list) or len(key) != len(SORT_FIELDS):
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+def parse_fields(value):
+    """Exported fields from a comma-separated list (all fields when empty); sort keys always included"""
+    if not value:
+        return list(FIELD_ORDER)
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in FIELD_ORDER]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return [field for field in SORT_FIELDS if field not in fields] + fields
+
+def export_filters(asset=None, outcome=None, start=None, end=None):
+    """Filters on stored trade fields; the date range is inclusive and compared as ISO strings"""
+    filters = {}
+    if asset:
+        filters["asset"] = asset
+    if outcome:
+        filters["outcome"] = outcome
+    if start:
+        filters["date_from"] = start.isoformat()
+    if end:
+        # Dates may carry a time part, so the bound is the start of the next day
+        filters["date_before"] = (end + timedelta(days=1)).isoformat()
+    return filters
+
+def sort_key(trade):
+    """Python equivalent of the database's (date, trade_id) ordering, missing values first"""
+    return tuple((trade.get(field) is not None, str(trade.get(field) or "")) for field in SORT_FIELDS)
+
+def matches_filters(trade, filters, after=None):
+    """Whether a trade passes the export filters and comes after the cursor"""
+    if "asset" in filters and trade.get("asset") != filters["asset"]:
+        return False
+    if "outcome" in filters and trade.get("outcome") != filters["outcome"]:
+        return False
+    date = trade.get("date")
+    if "date_from" in filters and (date is None or str(date) < filters["date_from"]):
+        return False
+    if "date_before" in filters and (date is None or str(date) >= filters["date_before"]):
+        return False
+    if after is not None:
+        return sort_key(trade) > sort_key(dict(zip(SORT_FIELDS, after)))
+    return True
+
+def ndjson_chunks(trades, limit=None):
+    """NDJSON lines for the trades; a page cut off at limit ends with a {"next_cursor": ...} line"""
+    lines, count, last = [], 0, None
+    for trade in trades:
+        lines.append(json.dumps(trade, default=str))
+        count += 1
+        last = trade
+        if len(lines) >= CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if limit and count >= limit and last is not None:
+        lines.append(json.dumps({"next_cursor": encode_cursor(last)}))
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+def csv_chunks(trades, fields, header=None, limit=None):
+    """CSV rows for the trades; a page cut off at limit ends with a "# next_cursor=..." line.
+
+    Tags are written as list literals like the uploaded exports.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header or fields)
+    rows, count, last = 1, 0, None
+    for trade in trades:
+        writer.writerow([_csv_value(trade.get(field)) for field in fields])
+        rows += 1
+        count += 1
+        last = trade
+        if rows >= CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if limit and count >= limit and last is not None:
+        buffer.write(f"{CSV_CURSOR_PREFIX}{encode_cursor(last)}\r\n")
+        rows += 1
+    if rows:
+        yield buffer.getvalue()
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return str(value)
+    return value
+
+print("✓ Export module loaded successfully")
@@ -0,0 +1,131 @@
+# generation.py
+print("Loading generation module...")
+
+import asyncio
+import os
+from contextlib import aclosing
+
+# Generation policy for chat answers. Ollama bounds output with num_predict
+# (thinking tokens included); the budgets below are also enforced here so a
+# long reasoning trace or answer is cut off as soon as it runs over.
+THINK = os.environ.get("GENERATION_THINK", "1") == "1"
+THINKING_TOKEN_BUDGET = int(os.environ.get("THINKING_TOKEN_BUDGET", "512"))
+ANSWER_TOKEN_BUDGET = int(os.environ.get("ANSWER_TOKEN_BUDGET", "256"))
+# Reasoning is recorded but not sent to the client unless this is set
+STREAM_THINKING = os.environ.get("STREAM_THINKING", "0") == "1"
+TEMPERATURE = 0.1
+
+THINK_OPEN, THINK_CLOSE = "<think>", "</think>"
+
+def generation_options(think=THINK):
+    """Ollama request fields for the current policy (think=False for models without reasoning)"""
+    budget = ANSWER_TOKEN_BUDGET + (THINKING_TOKEN_BUDGET if think else 0)
+    return {
+        "think": think,
+        "options": {
+            "temperature": TEMPERATURE,
+            "num_predict": budget
+        }
+    }
+
+class ThinkingSplitter:
+    """Split response text into thinking and answer parts for models that inline <think> tags.
+
+    Tags may be split across chunks, so a possible partial tag at the end of
+    a chunk is held back until the next one arrives.
+    """
+
+    def __init__(self):
+        self.thinking = False
+        self._pending = ""
+
+    def feed(self, text):
+        """Parts of text as (kind, text) pairs, kind being "thinking" or "answer" """
+        text = self._pending + text
+        self._pending = ""
+        parts = []
+        while text:
+            tag = THINK_CLOSE if self.thinking else THINK_OPEN
+            kind = "thinking" if self.thinking else "answer"
+            position = text.find(tag)
+            if position >= 0:
+                if position:
+                    parts.append((kind, text[:position]))
+                text = text[position + len(tag):]
+                self.thinking = not self.thinking
+                continue
+            # Hold back a suffix that could be the start of the tag
+            keep = next((n for n in range(min(len(tag) - 1, len(text)), 0, -1) if tag.startswith(text[-n:])), 0)
+            if len(text) > keep:
+                parts.append((kind, text[:len(text) - keep]))
+            self._pending = text[len(text) - keep:]
+            break
+        return parts
+
+    def flush(self):
+        """Whatever was held back once the stream has ended"""
+        pending, self._pending = self._pending, ""
+        return [("thinking" if self.thinking else "answer", pending)] if pending else []
+
+def strip_thinking(text):
+    """Answer part of a complete response"""
+    splitter = ThinkingSplitter()
+    parts = splitter.feed(text) + splitter.flush()
+    return "".join(part for kind, part in parts if kind == "answer").strip()
+
+async def generate_parts(chunks, stats, first_answer_within=None):
+    """Turn Ollama chunks into ("thinking" | "answer", text) parts within the budgets.
+
+    stats receives thinking_tokens, thinking_chars, answer_tokens and
+    stop_reason ("done", "thinking_budget", "answer_budget" or
+    "latency_budget"), plus the final chunk under "final" when generation
+    completes. When a budget is exceeded, including no answer token within
+    first_answer_within seconds, the upstream stream is closed, which stops
+    the generation.
+    """
+    stats.update({"thinking_tokens": 0, "thinking_chars": 0, "answer_tokens": 0})
+    splitter = ThinkingSplitter()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + first_answer_within if first_answer_within else None
+    async with aclosing(chunks):
+        while True:
+            try:
+                if deadline is not None and not stats["answer_tokens"]:
+                    chunk = await asyncio.wait_for(anext(chunks), max(0, deadline - loop.time()))
+                else:
+                    chunk = await anext(chunks)
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                stats["stop_reason"] = "latency_budget"
+                return
+
+            parts = []
+            if chunk.get("thinking"):
+                parts.append(("thinking", chunk["thinking"]))
+            if chunk.get("response"):
+                parts += splitter.feed(chunk["response"])
+            if chunk.get("done"):
+                parts += splitter.flush()
+
+            for kind, text in parts:
+                if kind == "thinking":
+                    stats["thinking_tokens"] += 1
+                    stats["thinking_chars"] += len(text)
+                    if stats["thinking_tokens"] > THINKING_TOKEN_BUDGET:
+                        stats["stop_reason"] = "thinking_budget"
+                        return
+                else:
+                    stats["answer_tokens"] += 1
+                    if stats["answer_tokens"] > ANSWER_TOKEN_BUDGET:
+                        stats["stop_reason"] = "answer_budget"
+                        return
+                yield kind, text
+
+            if chunk.get("done"):
+                stats["stop_reason"] = "done"
+                stats["final"] = chunk
+                return
+    raise Exception("Ollama stream ended without a done chunk")
+
+print("✓ Generation module loaded successfully")
@@ -0,0 +1,190 @@
+# ingest.py
+print("Loading ingest module...")
+
+import csv
+import hashlib
+import io
+import json
+
+from database import (transform_trade_data, restore_trade_rows, store_trader, store_trade_rollups,
+                      build_trade_rollups, ensure_trade_rollups, user_responses_of, find_user_trader,
+                      get_trader_state, get_trader_profile, find_upload, record_upload, get_trade_fingerprints,
+                      store_trade_fingerprints, store_resynced_trader)
+from profiles import analysis_stamp, is_stale, recompute_analysis
+from derived_metrics import calculate_metrics
+from behavioral import analyze_behavior
+from tags import parse_tags
+from export import CSV_CURSOR_PREFIX
+
+NUMERIC_FIELDS = ['price', 'volume', 'trade_value']
+# Optional numeric fields become None when blank so they pack as numbers
+OPTIONAL_FLOAT_FIELDS = ['capital_used', 'stop_loss', 'take_profit']
+OPTIONAL_INT_FIELDS = ['trade_duration']
+
+def parse_optional_number(value, cast):
+    """Parse a numeric CSV cell, returning None for blank or invalid values"""
+    if value is None or value == '':
+        return None
+    try:
+        return cast(float(value))
+    except (ValueError, OverflowError):
+        return None
+
+def parse_trade_csv(content):
+    """Parse an uploaded trade CSV into the row format used by the agents"""
+    # A page of a trade export ends with its continuation token
+    body, _, last_line = content.rstrip("\r\n").rpartition("\n")
+    if body and last_line.startswith(CSV_CURSOR_PREFIX):
+        content = body
+    csv_data = list(csv.DictReader(io.StringIO(content)))
+    
+    # Convert numeric fields
+    for row in csv_data:
+        for field in NUMERIC_FIELDS:
+            if field in row:
+                try:
+                    row[field] = float(row[field])
+                except:
+                    row[field] = 0.0
+        for field in OPTIONAL_FLOAT_FIELDS:
+            if field in row:
+                row[field] = parse_optional_number(row[field], float)
+        for field in OPTIONAL_INT_FIELDS:
+            if field in row:
+                row[field] = parse_optional_number(row[field], int)
+        
+        # Handle tags (exported as Python list literals)
+        row['tags'] = parse_tags(row.get('tags'))
+    
+    return csv_data
+
+def file_fingerprint(content):
+    """Content hash of an uploaded file"""
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def trade_fingerprint(trade):
+    """(key, content hash) of a stored trade; trades without a trade_id are keyed by their hash"""
+    digest = hashlib.sha256(json.dumps(trade, sort_keys=True, default=str).encode()).hexdigest()
+    return (trade.get("trade_id") or f"#{digest}"), digest
+
+def trade_fingerprints(trade_history):
+    """{key: hash} for a list of stored trades (a repeated key keeps its last version)"""
+    return dict(trade_fingerprint(trade) for trade in trade_history)
+
+def process_registration(user_data, content, report=None):
+    """Run an uploaded CSV through the agents and persist the trader in one write.
+
+    A user who is already registered re-syncs their existing trader instead
+    (see resync_trader).
+    """
+    report = report or (lambda stage, progress: None)
+    file_hash = file_fingerprint(content)
+    trader_id = find_user_trader(user_data["username"], user_data["password"])
+    if trader_id:
+        return resync_trader(trader_id, user_data, content, file_hash, report)
+    
+    report("parsing", 10)
+    csv_data = parse_trade_csv(content)
+    
+    report("transforming", 30)
+    trade_history = transform_trade_data(csv_data)
+    
+    report("calculating metrics", 50)
+    metrics = calculate_metrics(csv_data)
+    
+    report("analyzing behavior", 70)
+    profile = analyze_behavior(metrics, user_data)
+    
+    report("storing", 85)
+    stamp = analysis_stamp()
+    trader_id = store_trader(user_data, trade_history, metrics, profile, stamp)
+    
+    report("building rollups", 95)
+    build_trade_rollups(trader_id, trade_history)
+    store_trade_fingerprints(trader_id, trade_fingerprints(trade_history))
+    result = {"trader_id": trader_id, "trades": len(csv_data), "new_trades": len(csv_data), "changed_trades": 0}
+    record_upload(trader_id, file_hash, result)
+    
+    return result
+
+def resync_trader(trader_id, user_data, content, file_hash, report):
+    """Apply a re-uploaded export to an existing trader.
+
+    A file seen before is not parsed again. Otherwise each trade is matched
+    by trade_id and content hash against the stored fingerprints; only new
+    and changed trades are stored and applied to the rollups, and the
+    metrics and profile are reused when nothing changed.
+    """
+    user_responses = user_responses_of(user_data)
+    state = get_trader_state(trader_id)
+    if state is None:
+        raise ValueError(f"Trader {trader_id} not found")
+    analysis_current = state.get("user_responses") == user_responses and not is_stale(state)
+    result = {"trader_id": trader_id, "trades": state.get("trade_count", 0), "new_trades": 0, "changed_trades": 0}
+    
+    report("checking for changes", 10)
+    stored, seen, added, changed = {}, {}, {}, {}
+    if find_upload(trader_id, file_hash):
+        if analysis_current:
+            record_upload(trader_id, file_hash, result)
+            return dict(result, duplicate_file=True)
+        # Same trades, different questionnaire answers: only the analysis is redone
+    else:
+        report("parsing", 20)
+        trade_history = transform_trade_data(parse_trade_csv(content))
+        stored = get_trade_fingerprints(trader_id)
+        if not stored and state.get("trade_count"):
+            # Registered before fingerprints were kept
+            stored = trade_fingerprints(get_trader_profile(trader_id, refresh=False).get("trade_history", []))
+            store_trade_fingerprints(trader_id, stored)
+        
+        report("comparing trades", 30)
+        for trade in trade_history:
+            key, digest = trade_fingerprint(trade)
+            if seen.get(key, stored.get(key)) == digest:
+                continue
+            seen[key] = digest
+            # Keyed, so a trade repeated within the file keeps its last version
+            (changed if key in stored else added)[key] = trade
+        if not added and not changed and analysis_current:
+            record_upload(trader_id, file_hash, result)
+            return result
+    
+    report("merging trades", 45)
+    # The analysis is recomputed below, so a stale profile isn't refreshed (and
+    # written back) on the way
+    trader = get_trader_profile(trader_id, refresh=False)
+    # Registered before rollups were kept: materialize the stored history
+    # first, so the deltas below apply to complete rollups
+    ensure_trade_rollups(trader)
+    history, replaced, placed = [], [], set()
+    for trade in trader.get("trade_history", []):
+        trade_id = trade.get("trade_id")
+        if trade_id not in changed:
+            history.append(trade)
+            continue
+        replaced.append(trade)
+        if trade_id not in placed:
+            history.append(changed[trade_id])
+            placed.add(trade_id)
+    history += [trade for key, trade in changed.items() if key not in placed]
+    history += added.values()
+    
+    report("calculating metrics", 60)
+    metrics, profile, stamp = recompute_analysis(restore_trade_rows(history), user_responses)
+    
+    report("storing", 85)
+    store_resynced_trader(trader_id, trader.get("data_version", 0), history, metrics, profile, stamp,
+                          user_responses)
+    
+    report("updating rollups", 95)
+    if replaced:
+        store_trade_rollups(trader_id, replaced, sign=-1)
+    store_trade_rollups(trader_id, list(added.values()) + list(changed.values()))
+    store_trade_fingerprints(trader_id, {key: seen[key] for key in added}, {key: seen[key] for key in changed})
+    
+    result.update(trades=len(history), new_trades=len(added), changed_trades=len(changed))
+    record_upload(trader_id, file_hash, result)
+    return result
+
+print("✓ Ingest module loaded successfully")
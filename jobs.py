@@ -0,0 +1,71 @@
+# jobs.py
+print("Loading jobs module...")
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import shared_cache
+
+# Local worker pool for long-running jobs such as registrations
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+# Jobs are kept this long after their last update so clients can still read their status
+JOB_RETENTION_SECONDS = 3600
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_lock = threading.Lock()
+
+# Job state lives in the shared cache so any worker can answer status polls
+def _job_key(job_id):
+    return f"job:{job_id}"
+
+def _update_job(job_id, **fields):
+    with _lock:
+        job = shared_cache.get(_job_key(job_id))
+        if job:
+            job.update(fields)
+            job["updated_at"] = time.time()
+            shared_cache.set(_job_key(job_id), job, ttl=JOB_RETENTION_SECONDS)
+
+def _run_job(job_id, fn, args):
+    def report(stage, progress):
+        _update_job(job_id, stage=stage, progress=progress)
+    
+    _update_job(job_id, status="running", stage="started")
+    try:
+        result = fn(*args, report=report)
+        _update_job(job_id, status="done", stage="done", progress=100, result=result)
+        print(f"✓ Job {job_id} finished")
+    except Exception as e:
+        traceback.print_exc()
+        _update_job(job_id, status="failed", error=str(e))
+        print(f"✗ Job {job_id} failed: {e}")
+
+def submit_job(kind, fn, *args):
+    """Queue fn(*args, report=...) on the worker pool and return its job id"""
+    shared_cache.purge_expired()
+    job_id = str(uuid.uuid4())
+    now = time.time()
+    with _lock:
+        shared_cache.set(_job_key(job_id), {
+            "job_id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }, ttl=JOB_RETENTION_SECONDS)
+    _executor.submit(_run_job, job_id, fn, args)
+    return job_id
+
+def get_job(job_id):
+    """Snapshot of a job's status, or None if unknown"""
+    return shared_cache.get(_job_key(job_id))
+
+print("✓ Jobs module loaded successfully")
@@ -0,0 +1,335 @@
+# loadtest.py - Concurrent chat load test with TTFT and tail latency reporting
+print("Loading loadtest module...")
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+import time
+
+import httpx
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+    print("Warning: psutil not installed, server CPU/RSS will not be sampled")
+
+from synthetic_data import generate_csv
+
+QUESTIONS = [
+    "What's your trading strategy?",
+    "How do you handle losses?",
+    "What tokens do you prefer?",
+    "Tell me about your recent buys",
+    "How risky are you?",
+    "Why did you sell last time?"
+]
+
+# Not one of the common-question intents, so it always reaches the LLM
+CANCEL_QUESTION = "Walk me through what you were thinking on your last few trades"
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+def summarize(values):
+    """p50/p95/p99/max summary in milliseconds"""
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2) if values else None,
+        "p95_ms": round(percentile(values, 95) * 1000, 2) if values else None,
+        "p99_ms": round(percentile(values, 99) * 1000, 2) if values else None,
+        "max_ms": round(max(values) * 1000, 2) if values else None
+    }
+
+async def wait_for_server(url, timeout=30):
+    """Poll url until it answers or timeout expires"""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+def start_servers(args):
+    """Launch the mock LLM and the app as subprocesses"""
+    mock = subprocess.Popen([
+        sys.executable, "mock_llm.py",
+        "--port", str(args.mock_port),
+        "--token-rate", str(args.token_rate),
+        "--tokens", str(args.response_tokens),
+        "--prompt-eval-delay", str(args.prompt_eval_delay),
+        "--thinking-tokens", str(args.thinking_tokens)
+    ])
+    env = dict(os.environ, OLLAMA_URL=f"http://127.0.0.1:{args.mock_port}/api/generate")
+    if args.scenario == "cancel":
+        # Background answer generation would also show up as active mock generations
+        env["PRECOMPUTE_ANSWERS"] = "0"
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning"
+    ], env=env)
+    return mock, server
+
+async def sample_process(pid, interval, samples, stop):
+    """Record CPU% and RSS of the server process (and its workers) until stopped"""
+    if psutil is None or pid is None:
+        return
+    process = psutil.Process(pid)
+    started = time.monotonic()
+    while not stop.is_set():
+        try:
+            procs = [process] + process.children(recursive=True)
+            cpu = sum(p.cpu_percent(None) for p in procs)
+            rss = sum(p.memory_info().rss for p in procs)
+        except psutil.Error:
+            return
+        samples.append({
+            "t": round(time.monotonic() - started, 2),
+            "cpu_percent": cpu,
+            "rss_mb": round(rss / 1e6, 1)
+        })
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+async def register_user(client, user_index, trades):
+    """Register a virtual user with a synthetic CSV; returns (username, password, trader_id)"""
+    username = f"loadtest-{int(time.time())}-{user_index}"
+    password = "loadtest"
+    files = {"trade_file": ("trades.csv", generate_csv(trades, seed=user_index), "text/csv")}
+    data = {
+        "username": username,
+        "password": password,
+        "primary_strategy": "Technical",
+        "loss_reaction": "I cut my losses",
+        "risk_tolerance": "Medium"
+    }
+    response = await client.post("/register", data=data, files=files)
+    response.raise_for_status()
+    match = re.search(r'data-job-id="([0-9a-f-]+)"', response.text)
+    if not match:
+        raise RuntimeError("Registration response did not contain a job id")
+
+    # Registration runs as a background job; poll until it finishes
+    while True:
+        status = await client.get(f"/register/status/{match.group(1)}")
+        status.raise_for_status()
+        job = status.json()
+        if job["status"] == "done":
+            return username, password, job["result"]["trader_id"]
+        if job["status"] == "failed":
+            raise RuntimeError(f"Registration failed: {job['error']}")
+        await asyncio.sleep(0.25)
+
+async def stream_chat(client, trader_id, message):
+    """Send one chat message and time the SSE stream"""
+    result = {"ttft": None, "inter_token": [], "total": None, "tokens": 0, "source": None, "error": None}
+    started = time.perf_counter()
+    last_token = None
+    try:
+        async with client.stream("POST", f"/chat/{trader_id}/message", json={"message": message}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                now = time.perf_counter()
+                if event.get("token"):
+                    if last_token is None:
+                        result["ttft"] = now - started
+                    else:
+                        result["inter_token"].append(now - last_token)
+                    last_token = now
+                    result["tokens"] += 1
+                if event.get("done"):
+                    result["source"] = event.get("source")
+                    break
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["total"] = time.perf_counter() - started
+    if result["source"] == "error":
+        result["error"] = result["error"] or "server reported error"
+    return result
+
+async def virtual_user(base_url, user_index, args, results):
+    """Register, log in and hold a multi-turn conversation"""
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout) as client:
+        try:
+            username, password, trader_id = await register_user(client, user_index, args.trades)
+            response = await client.post("/authenticate", data={"username": username, "password": password})
+            response.raise_for_status()
+        except Exception as e:
+            results["setup_errors"].append(f"{type(e).__name__}: {e}")
+            return
+
+        for turn in range(args.turns):
+            message = QUESTIONS[(user_index + turn) % len(QUESTIONS)]
+            results["streams"].append(await stream_chat(client, trader_id, message))
+            if args.think_time:
+                await asyncio.sleep(args.think_time)
+
+async def run_load_test(args, base_url, server_pid):
+    """Run all virtual users concurrently and build the report"""
+    results = {"streams": [], "setup_errors": []}
+    samples = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_process(server_pid, args.sample_interval, samples, stop))
+
+    started = time.perf_counter()
+    users = []
+    for i in range(args.users):
+        users.append(asyncio.create_task(virtual_user(base_url, i, args, results)))
+        if args.ramp_up:
+            await asyncio.sleep(args.ramp_up / args.users)
+    await asyncio.gather(*users)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await sampler
+
+    streams = results["streams"]
+    completed = [s for s in streams if not s["error"]]
+    inter_token = [gap for s in completed for gap in s["inter_token"]]
+    return {
+        "config": {k: v for k, v in vars(args).items()},
+        "elapsed_seconds": round(elapsed, 2),
+        "streams": len(streams),
+        "setup_errors": len(results["setup_errors"]),
+        "error_rate": round((len(streams) - len(completed)) / len(streams), 4) if streams else None,
+        "fallback_rate": round(len([s for s in completed if s["source"] == "fallback"]) / len(completed), 4) if completed else None,
+        "ttft": summarize([s["ttft"] for s in completed if s["ttft"] is not None]),
+        "inter_token_latency": summarize(inter_token),
+        "total_stream_time": summarize([s["total"] for s in completed]),
+        "errors": sorted(set([s["error"] for s in streams if s["error"]] + results["setup_errors"]))[:20],
+        "server_samples": samples
+    }
+
+async def run_cancel_check(args, base_url):
+    """Disconnect mid-answer and check that the mock LLM stops generating within the bound"""
+    mock_stats = f"http://127.0.0.1:{args.mock_port}/stats"
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout) as client:
+        _, _, trader_id = await register_user(client, 0, args.trades)
+        before = (await client.get(mock_stats)).json()
+
+        # Read until the first token, then drop the connection
+        async with client.stream("POST", f"/chat/{trader_id}/message", json={"message": CANCEL_QUESTION}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: ") and json.loads(line[6:]).get("token"):
+                    break
+        disconnected_at = time.perf_counter()
+        at_disconnect = (await client.get(mock_stats)).json()
+
+        while True:
+            stats = (await client.get(mock_stats)).json()
+            elapsed = time.perf_counter() - disconnected_at
+            stopped = stats["active"] == 0 and stats["cancelled"] > before["cancelled"]
+            if stopped or elapsed > args.cancel_bound:
+                break
+            await asyncio.sleep(0.01)
+
+    return {
+        "config": {k: v for k, v in vars(args).items()},
+        "stopped": stopped,
+        "completed_anyway": stats["completed"] > before["completed"],
+        "stop_latency_ms": round(elapsed * 1000, 2),
+        "bound_ms": args.cancel_bound * 1000,
+        "tokens_after_disconnect": stats["tokens_sent"] - at_disconnect["tokens_sent"]
+    }
+
+def print_cancel_report(report):
+    """Print the outcome of the disconnect check"""
+    if report["stopped"]:
+        print(f"\n✓ Upstream generation stopped {report['stop_latency_ms']} ms after the client disconnected "
+              f"({report['tokens_after_disconnect']} tokens generated after disconnect)")
+    else:
+        print(f"\n✗ Upstream generation still running {report['stop_latency_ms']} ms after the client disconnected "
+              f"(bound {report['bound_ms']} ms)")
+
+def print_report(report):
+    """Print a compact human-readable summary"""
+    print(f"\n{report['streams']} streams in {report['elapsed_seconds']}s "
+          f"(error rate {report['error_rate']}, fallback rate {report['fallback_rate']}, "
+          f"setup errors {report['setup_errors']})")
+    for name in ("ttft", "inter_token_latency", "total_stream_time"):
+        s = report[name]
+        print(f"  {name:<20} p50 {s['p50_ms']} ms  p95 {s['p95_ms']} ms  p99 {s['p99_ms']} ms  max {s['max_ms']} ms")
+    if report["server_samples"]:
+        peak_cpu = max(s["cpu_percent"] for s in report["server_samples"])
+        peak_rss = max(s["rss_mb"] for s in report["server_samples"])
+        print(f"  server peak CPU {peak_cpu:.0f}%  peak RSS {peak_rss} MB")
+    for error in report["errors"]:
+        print(f"  error: {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the chat streaming endpoint")
+    parser.add_argument("--scenario", choices=["chat", "cancel"], default="chat",
+                        help="chat: concurrent multi-turn load; cancel: check a client disconnect stops the LLM")
+    parser.add_argument("--cancel-bound", type=float, default=2.0,
+                        help="Seconds within which generation must stop after a disconnect")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--turns", type=int, default=3, help="Chat messages per user")
+    parser.add_argument("--trades", type=int, default=100, help="Synthetic trades uploaded per user")
+    parser.add_argument("--ramp-up", type=float, default=0, help="Seconds over which users start")
+    parser.add_argument("--think-time", type=float, default=0, help="Pause between turns (s)")
+    parser.add_argument("--base-url", help="Test an already running app instead of launching one")
+    parser.add_argument("--server-pid", type=int, help="PID to sample when using --base-url")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--mock-port", type=int, default=11435)
+    parser.add_argument("--token-rate", type=float, default=20, help="Mock LLM tokens per second")
+    parser.add_argument("--response-tokens", type=int, default=120)
+    parser.add_argument("--prompt-eval-delay", type=float, default=0.2)
+    parser.add_argument("--thinking-tokens", type=int, default=0, help="Mock LLM reasoning tokens per answer")
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--request-timeout", type=float, default=300)
+    parser.add_argument("--output", default="loadtest_report.json")
+    args = parser.parse_args()
+
+    processes = []
+    base_url = args.base_url
+    server_pid = args.server_pid
+    try:
+        if not base_url:
+            processes = start_servers(args)
+            base_url = f"http://127.0.0.1:{args.port}"
+            server_pid = processes[1].pid
+            asyncio.run(wait_for_server(f"http://127.0.0.1:{args.mock_port}/stats"))
+            asyncio.run(wait_for_server(base_url + "/"))
+
+        if args.scenario == "cancel":
+            print(f"🚀 Checking disconnect handling against {base_url}")
+            report = asyncio.run(run_cancel_check(args, base_url))
+        else:
+            print(f"🚀 Load testing {base_url} with {args.users} users x {args.turns} turns")
+            report = asyncio.run(run_load_test(args, base_url, server_pid))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    if args.scenario == "cancel":
+        print_cancel_report(report)
+    else:
+        print_report(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Report saved to {args.output}")
+    if args.scenario == "cancel" and not report["stopped"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,140 +1,63 @@
 # main.py
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Query
 from fastapi.responses import HTMLResponse, StreamingResponse
-import csv
-import io
+from fastapi.concurrency import run_in_threadpool
 import uvicorn
-import json
-import requests
-from database import store_user_data, authenticate_user, store_derived_metrics, store_behavioral_profile, get_trader_profile
-from derived_metrics import calculate_metrics
-from behavioral import analyze_behavior
-from chat import generate_response, build_trader_context, create_prompt, fallback_response
+import asyncio
+import os
+import time
+from contextlib import aclosing
+from database import (ensure_indexes, authenticate_user, get_trader_profile, get_trader_stats,
+                      ensure_trade_rollups, get_rollup_series, get_range_metrics, get_activity_histogram,
+                      export_trades, STORED_TO_CSV_FIELDS)
+from analytics import AGGREGATES, get_analytics
+from chat import build_trader_context, create_prompt, fallback_response, stream_ollama
+from ingest import process_registration
+from jobs import submit_job, get_job
+from telemetry import elapsed_ms, ollama_stats, finish_timings, record_request, get_summary
+from streaming import coalesce_frames, wait_for_disconnect, EventStreamResponse, SSE_HEADERS
+from generation import generate_parts, STREAM_THINKING
+from router import route_message, tier_payload, TIER_BUDGETS
+from tags import get_trade_index, query_trade_index
+from export import EXPORT_FORMATS, parse_fields, decode_cursor, export_filters, ndjson_chunks, csv_chunks
+from rollups import GRANULARITIES, WEEKDAYS, heatmap_matrix, describe_active_hours, parse_range_date
+from precompute import (start_scheduler, schedule_precompute, live_request, canonical_intent,
+                        get_precomputed_answer)
+from pages import ASSETS, asset_response, chat_page, register_status_page
 
 app = FastAPI()
 
+@app.on_event("startup")
+async def start_background_tasks():
+    # Lookups by trader_id and the rollup upserts rely on these, so they are
+    # created before the first request rather than on first use
+    try:
+        await run_in_threadpool(ensure_indexes)
+    except Exception as e:
+        print(f"✗ Error ensuring indexes: {e}")
+    start_scheduler()
+
 @app.get("/", response_class=HTMLResponse)
-def home():
-    return """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Trade Agent</title>
-        <style>
-            body { font-family: Arial, sans-serif; text-align: center; padding: 50px; }
-            .btn { padding: 15px 30px; margin: 10px; font-size: 18px; cursor: pointer; 
-                   background: #007bff; color: white; border: none; border-radius: 5px; }
-        </style>
-    </head>
-    <body>
-        <h1>Conversational Trade Agent</h1>
-        <p>Welcome! Are you a new or existing user?</p>
-        <button class="btn" onclick="location.href='/new_user'">New User</button>
-        <button class="btn" onclick="location.href='/login'">Existing User</button>
-    </body>
-    </html>
-    """
+def home(request: Request):
+    return asset_response(request, ASSETS["home"])
 
 @app.get("/new_user", response_class=HTMLResponse)
-def new_user():
-    return """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Register</title>
-        <style>
-            body { font-family: Arial, sans-serif; padding: 20px; max-width: 600px; margin: 0 auto; }
-            .form-group { margin: 15px 0; }
-            label { display: block; margin-bottom: 5px; font-weight: bold; }
-            input, select, textarea { width: 100%; padding: 10px; border: 1px solid #ccc; border-radius: 5px; }
-            .btn { padding: 12px 24px; background: #007bff; color: white; border: none; 
-                   border-radius: 5px; cursor: pointer; font-size: 16px; }
-            .btn:hover { background: #0056b3; }
-        </style>
-    </head>
-    <body>
-        <h2>New User Registration</h2>
-        <form action="/register" method="post" enctype="multipart/form-data">
-            <div class="form-group">
-                <label>Username:</label>
-                <input type="text" name="username" required>
-            </div>
-            
-            <div class="form-group">
-                <label>Password:</label>
-                <input type="password" name="password" required>
-            </div>
-            
-            <div class="form-group">
-                <label>Upload Trade Data (CSV file):</label>
-                <input type="file" name="trade_file" accept=".csv" required>
-            </div>
-            
-            <div class="form-group">
-                <label>Primary Trading Strategy:</label>
-                <select name="primary_strategy">
-                    <option value="Technical">Technical</option>
-                    <option value="Momentum">Momentum</option>
-                    <option value="Value">Value</option>
-                    <option value="Sentiment">Sentiment</option>
-                </select>
-            </div>
-            
-            <div class="form-group">
-                <label>How do you react to losses?</label>
-                <textarea name="loss_reaction" rows="3" placeholder="Describe your typical response..."></textarea>
-            </div>
-            
-            <div class="form-group">
-                <label>Risk Tolerance:</label>
-                <select name="risk_tolerance">
-                    <option value="Medium">Medium</option>
-                    <option value="High">High</option>
-                    <option value="Low">Low</option>
-                </select>
-            </div>
-            
-            <button type="submit" class="btn">Register</button>
-        </form>
-    </body>
-    </html>
-    """
+def new_user(request: Request):
+    return asset_response(request, ASSETS["new_user"])
 
 @app.get("/login", response_class=HTMLResponse)
-def login():
-    return """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Login</title>
-        <style>
-            body { font-family: Arial, sans-serif; padding: 20px; max-width: 400px; margin: 0 auto; }
-            .form-group { margin: 15px 0; }
-            label { display: block; margin-bottom: 5px; font-weight: bold; }
-            input { width: 100%; padding: 10px; border: 1px solid #ccc; border-radius: 5px; }
-            .btn { padding: 12px 24px; background: #007bff; color: white; border: none; 
-                   border-radius: 5px; cursor: pointer; font-size: 16px; }
-        </style>
-    </head>
-    <body>
-        <h2>Login</h2>
-        <form action="/authenticate" method="post">
-            <div class="form-group">
-                <label>Username:</label>
-                <input type="text" name="username" required>
-            </div>
-            <div class="form-group">
-                <label>Password:</label>
-                <input type="password" name="password" required>
-            </div>
-            <button type="submit" class="btn">Login</button>
-        </form>
-    </body>
-    </html>
-    """
+def login(request: Request):
+    return asset_response(request, ASSETS["login"])
+
+def register_trader(user_data, content, report=None):
+    """Registration job: run the pipeline, then queue answers to common questions"""
+    result = process_registration(user_data, content, report)
+    schedule_precompute(result["trader_id"])
+    return result
 
 @app.post("/register")
 def register(
+    request: Request,
     username: str = Form(...),
     password: str = Form(...),
     trade_file: UploadFile = File(...),
@@ -142,24 +65,8 @@ def register(
     loss_reaction: str = Form(...),
     risk_tolerance: str = Form(...)
 ):
-    # Read and parse CSV file
+    # Only the upload is read here; parsing and analysis run on the job pool
     content = trade_file.file.read().decode('utf-8')
-    csv_data = list(csv.DictReader(io.StringIO(content)))
-    
-    # Convert numeric fields
-    for row in csv_data:
-        for field in ['price', 'volume', 'trade_value']:
-            if field in row:
-                try:
-                    row[field] = float(row[field])
-                except:
-                    row[field] = 0
-        
-        # Handle tags
-        if 'tags' in row and row['tags']:
-            row['tags'] = [tag.strip() for tag in row['tags'].split(',')]
-        else:
-            row['tags'] = []
     
     # Create user data
     user_data = {
@@ -170,35 +77,15 @@ def register(
         "risk_tolerance": risk_tolerance
     }
     
-    # Process data through agents
-    trader_id = store_user_data(user_data, csv_data)
-    metrics = calculate_metrics(csv_data)
-    store_derived_metrics(trader_id, metrics)
-    profile = analyze_behavior(metrics, user_data)
-    store_behavioral_profile(trader_id, profile)
-    
-    return HTMLResponse(f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Success</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; padding: 20px; text-align: center; }}
-            .success {{ background: #d4edda; padding: 20px; border-radius: 5px; margin: 20px 0; }}
-            .btn {{ padding: 12px 24px; background: #007bff; color: white; text-decoration: none; 
-                   border-radius: 5px; display: inline-block; margin: 10px; }}
-        </style>
-    </head>
-    <body>
-        <div class="success">
-            <h2>Registration Successful!</h2>
-            <p>Processed {len(csv_data)} trades</p>
-            <p>Trader ID: {trader_id}</p>
-        </div>
-        <a href="/chat/{trader_id}" class="btn">Start Chatting</a>
-    </body>
-    </html>
-    """)
+    job_id = submit_job("registration", register_trader, user_data, content)
+    return asset_response(request, register_status_page(job_id))
+
+@app.get("/register/status/{job_id}")
+def register_status(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
 
 @app.post("/authenticate")
 def auth(username: str = Form(...), password: str = Form(...)):
@@ -219,215 +106,284 @@ def auth(username: str = Form(...), password: str = Form(...)):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
 @app.get("/chat/{trader_id}", response_class=HTMLResponse)
-def chat(trader_id: str):
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Trade Agent Chat</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; }}
-            .container {{ max-width: 800px; margin: 0 auto; }}
-            .chat-box {{ height: 400px; border: 2px solid #ccc; padding: 15px; 
-                        overflow-y: scroll; margin-bottom: 15px; border-radius: 10px; 
-                        background: #f9f9f9; }}
-            .input-area {{ display: flex; gap: 10px; }}
-            input {{ flex: 1; padding: 12px; border: 1px solid #ccc; border-radius: 5px; }}
-            button {{ padding: 12px 20px; background: #007bff; color: white; 
-                     border: none; border-radius: 5px; cursor: pointer; }}
-            .message {{ margin: 10px 0; padding: 12px; border-radius: 8px; }}
-            .user {{ background: #007bff; color: white; text-align: right; }}
-            .agent {{ background: #e9ecef; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h2>💬 Chat with Your Trade Agent</h2>
-            <div id="chatBox" class="chat-box"></div>
-            <div class="input-area">
-                <input type="text" id="messageInput" placeholder="Ask about my trading strategy, past trades, preferences..." 
-                       onkeypress="if(event.key==='Enter') sendMessage()">
-                <button onclick="sendMessage()">Send</button>
-            </div>
-        </div>
-        
-        <script>
-            let currentMessageDiv = null;
-            
-            function sendMessage() {{
-                const input = document.getElementById('messageInput');
-                const message = input.value.trim();
-                if (!message) return;
-                
-                addMessage(message, 'user');
-                input.value = '';
-                
-                // Create agent message div for streaming
-                currentMessageDiv = createAgentMessage();
-                
-                // Start streaming
-                startStreaming(message);
-            }}
-            
-            function createAgentMessage() {{
-                const box = document.getElementById('chatBox');
-                const div = document.createElement('div');
-                div.className = 'message agent';
-                div.innerHTML = '<strong>🤖 Agent:</strong> <span class="content"></span>';
-                box.appendChild(div);
-                box.scrollTop = box.scrollHeight;
-                return div.querySelector('.content');
-            }}
-            
-            function startStreaming(message) {{
-                fetch('/chat/{trader_id}/message', {{
-                    method: 'POST',
-                    headers: {{'Content-Type': 'application/json'}},
-                    body: JSON.stringify({{'message': message}})
-                }})
-                .then(response => {{
-                    const reader = response.body.getReader();
-                    const decoder = new TextDecoder();
-                    
-                    function readStream() {{
-                        return reader.read().then(function(result) {{
-                            if (result.done) return;
-                            
-                            const chunk = decoder.decode(result.value, {{stream: true}});
-                            const lines = chunk.split('\\n');
-                            
-                            for (let line of lines) {{
-                                if (line.startsWith('data: ')) {{
-                                    try {{
-                                        const data = JSON.parse(line.slice(6));
-                                        if (data.token) {{
-                                            currentMessageDiv.textContent += data.token;
-                                            document.getElementById('chatBox').scrollTop = document.getElementById('chatBox').scrollHeight;
-                                        }}
-                                        if (data.done) {{
-                                            return; // Stream completed
-                                        }}
-                                    }} catch (e) {{
-                                        // Ignore parsing errors
-                                    }}
-                                }}
-                            }}
-                            
-                            return readStream();
-                        }});
-                    }}
-                    
-                    return readStream();
-                }})
-                .catch(error => {{
-                    if (currentMessageDiv) {{
-                        currentMessageDiv.textContent = 'Error: ' + error.message;
-                    }}
-                }});
-            }}
-            
-            function addMessage(text, sender) {{
-                const box = document.getElementById('chatBox');
-                const div = document.createElement('div');
-                div.className = `message ${{sender}}`;
-                div.innerHTML = `<strong>${{sender === 'user' ? 'You' : '🤖 Agent'}}:</strong> ${{text}}`;
-                box.appendChild(div);
-                box.scrollTop = box.scrollHeight;
-            }}
-            
-            addMessage("Hello! I'm your trading agent. Ask me about my strategy, trades, or decisions!", 'agent');
-        </script>
-    </body>
-    </html>
-    """
+def chat(request: Request, trader_id: str):
+    return asset_response(request, chat_page(trader_id))
+
+@app.get("/static/{name}")
+def static_asset(request: Request, name: str):
+    if name not in ("chat.css", "chat.js", "register.js"):
+        raise HTTPException(status_code=404, detail="Not found")
+    return asset_response(request, ASSETS[name])
 
 @app.post("/chat/{trader_id}/message")
-def chat_message(trader_id: str, message: dict):
+async def chat_message(request: Request, trader_id: str, message: dict):
     """Handle streaming chat messages"""
-    def generate_stream():
-        try:
-            trader_data = get_trader_profile(trader_id)
-            user_message = message["message"]
-            
-            if not trader_data:
-                yield f"data: {json.dumps({'token': 'Sorry, I could not find your trader profile.'})}\n\n"
-                yield f"data: {json.dumps({'done': True})}\n\n"
-                return
-            
-            # Extract trader information
-            profile = trader_data.get("behavioral_profile", {})
-            profile_features = profile.get("profile_features", {})
-            derived_features = profile.get("derived_features", {})
-            trade_history = trader_data.get("trade_history", [])
-            user_responses = trader_data.get("user_responses", {})
-            
-            # Build context and create prompt
-            context = build_trader_context(profile_features, derived_features, trade_history, user_responses)
-            prompt = create_prompt(user_message, context)
-            
-            # Try Ollama streaming
+    request_start = time.perf_counter()
+    
+    async def generate_events():
+        """Yield answer tokens (str) and the final done event (dict)"""
+        timings = {"queue_ms": elapsed_ms(request_start), "token_count": 0}
+        first_token_at = None
+        
+        def done_event(source):
+            timings["source"] = source
+            finish_timings(timings, request_start, first_token_at)
+            record_request(trader_id, timings)
+            return {'done': True, 'source': source, 'timings': timings}
+        
+        # Background precomputation pauses while live requests are in flight
+        with live_request():
             try:
-                # Ollama streaming request
-                payload = {
-                    "model": "deepseek-r1:8b",
-                    "prompt": prompt,
-                    "stream": True,
-                    "think": True,
-                    "options": {
-                        "temperature": 0.1,
-                        "max_tokens": 200
-                    }
-                }
+                stage_start = time.perf_counter()
+                trader_data = await run_in_threadpool(get_trader_profile, trader_id)
+                timings["profile_fetch_ms"] = elapsed_ms(stage_start)
+                user_message = message["message"]
+                
+                if not trader_data:
+                    yield 'Sorry, I could not find your trader profile.'
+                    yield done_event("not_found")
+                    return
+                
+                # Extract trader information
+                stage_start = time.perf_counter()
+                profile = trader_data.get("behavioral_profile", {})
+                profile_features = profile.get("profile_features", {})
+                derived_features = profile.get("derived_features", {})
+                trade_history = trader_data.get("trade_history", [])
+                user_responses = trader_data.get("user_responses", {})
+                
+                # Build context and create prompt
+                trade_index = await run_in_threadpool(get_trade_index, trader_data)
+                context = build_trader_context(profile_features, derived_features, trade_history, user_responses,
+                                               trade_index, user_message)
+                prompt = create_prompt(user_message, context)
+                timings["context_build_ms"] = elapsed_ms(stage_start)
+                
+                # Common questions are answered from background-generated answers
+                intent = canonical_intent(user_message, trade_index)
+                if intent:
+                    answer = get_precomputed_answer(trader_data, intent)
+                    if answer:
+                        first_token_at = time.perf_counter()
+                        timings["ttft_ms"] = elapsed_ms(request_start)
+                        timings["token_count"] += 1
+                        yield answer
+                        yield done_event("precomputed")
+                        return
+                    schedule_precompute(trader_id)
                 
-                response = requests.post(
-                    "http://localhost:11434/api/generate", 
-                    json=payload, 
-                    stream=True
-                )
+                # Pick the cheapest tier for the question: template, small model or reasoning model
+                route = route_message(user_message, trade_index)
+                timings["tier"] = route["tier"]
+                timings["route_reason"] = route["reason"]
+                if route["tier"] == "template":
+                    answer = fallback_response(user_message, profile_features, trade_history)
+                    first_token_at = time.perf_counter()
+                    timings["ttft_ms"] = elapsed_ms(request_start)
+                    timings["token_count"] += 1
+                    yield answer
+                    yield done_event("template")
+                    return
                 
-                if response.status_code == 200:
-                    for line in response.iter_lines():
-                        if line:
-                            try:
-                                chunk = line.decode('utf-8')
-                                data = json.loads(chunk)
-                                if 'response' in data and data['response']:
-                                    # Send each token/word
-                                    yield f"data: {json.dumps({'token': data['response']})}\n\n"
-                                if data.get('done', False):
-                                    yield f"data: {json.dumps({'done': True})}\n\n"
-                                    return
-                            except:
-                                continue
-                else:
-                    raise Exception("Ollama API error")
+                # Try Ollama streaming
+                try:
+                    for tier in route["tiers"]:
+                        # Ollama streaming request; thinking is counted but only forwarded if enabled
+                        timings["tier"] = tier
+                        generation = {}
+                        parts = generate_parts(stream_ollama(tier_payload(prompt, tier), timings), generation,
+                                               first_answer_within=TIER_BUDGETS[tier])
+                        try:
+                            async with aclosing(parts):
+                                async for kind, text in parts:
+                                    if kind == "thinking":
+                                        if STREAM_THINKING:
+                                            yield {"thinking": text}
+                                        continue
+                                    if first_token_at is None:
+                                        first_token_at = time.perf_counter()
+                                        timings["ttft_ms"] = elapsed_ms(request_start)
+                                    timings["token_count"] += 1
+                                    yield text
+                        except Exception:
+                            # An upstream error before any answer moves on to the next tier
+                            if first_token_at is not None:
+                                raise
+                            generation["stop_reason"] = "error"
+                        
+                        timings["thinking_tokens"] = generation["thinking_tokens"]
+                        timings["thinking_chars"] = generation["thinking_chars"]
+                        timings["stop_reason"] = generation["stop_reason"]
+                        if generation["answer_tokens"]:
+                            break
                     
-            except Exception as e:
-                # Fallback to rule-based response
-                fallback_resp = fallback_response(user_message, profile_features, trade_history)
+                    if not generation["answer_tokens"]:
+                        raise Exception(f"No answer generated ({generation['stop_reason']})")
+                    if "final" in generation:
+                        # Ollama reports its own prompt-eval/eval stats on the final chunk
+                        timings["ollama"] = ollama_stats(generation["final"])
+                    yield done_event("llm")
+                    return
+                    
+                except Exception as e:
+                    # Fallback to rule-based response
+                    fallback_resp = fallback_response(user_message, profile_features, trade_history)
                 
-                # Simulate streaming for fallback response
-                words = fallback_resp.split()
-                for word in words:
-                    yield f"data: {json.dumps({'token': word + ' '})}\n\n"
+                    # Simulate streaming for fallback response
+                    words = fallback_resp.split()
+                    for word in words:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            timings["ttft_ms"] = elapsed_ms(request_start)
+                        timings["token_count"] += 1
+                        yield word + ' '
                 
-                yield f"data: {json.dumps({'done': True})}\n\n"
+                    yield done_event("fallback")
                 
-        except Exception as e:
-            yield f"data: {json.dumps({'token': f'Error: {str(e)}'})}\n\n"
-            yield f"data: {json.dumps({'done': True})}\n\n"
+            except (asyncio.CancelledError, GeneratorExit):
+                # The client went away; the upstream stream was closed on the way out
+                done_event("cancelled")
+                raise
+            except Exception as e:
+                yield f'Error: {str(e)}'
+                yield done_event("error")
     
-    return StreamingResponse(
-        generate_stream(),
-        media_type="text/plain",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-        }
+    # Tokens are coalesced into SSE frames on a small time/size budget; a client
+    # disconnect stops the stream and the upstream generation immediately
+    return EventStreamResponse(
+        coalesce_frames(generate_events(), disconnected=wait_for_disconnect(request)),
+        headers=SSE_HEADERS
     )
 
+@app.get("/analytics/{name}")
+def analytics(name: str):
+    """Population analytics: overview, win_rates, assets or personas"""
+    if name not in AGGREGATES:
+        raise HTTPException(status_code=404, detail="Unknown analytics view")
+    return get_analytics(name)
+
+@app.get("/trader/{trader_id}/stats")
+def trader_stats(trader_id: str):
+    stats = get_trader_stats(trader_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Trader not found")
+    return stats
+
+@app.get("/trader/{trader_id}/trades/search")
+def search_trades(request: Request, trader_id: str, limit: int = 100):
+    """Trades matching every given filter, e.g. ?tags=panic sell&trading_platform=KuCoin"""
+    trader = get_trader_profile(trader_id)
+    if not trader:
+        raise HTTPException(status_code=404, detail="Trader not found")
+    
+    params = request.query_params
+    filters = {field: params.getlist(field) for field in params.keys() if field != "limit"}
+    try:
+        positions = query_trade_index(get_trade_index(trader), filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    trade_history = trader.get("trade_history", [])
+    return {
+        "count": len(positions),
+        "trades": [trade_history[i] for i in positions[:limit]]
+    }
+
+@app.get("/trader/{trader_id}/trades/export")
+def export_trader_trades(trader_id: str, export_format: str = Query("ndjson", alias="format"),
+                         fields: str = None, asset: str = None, outcome: str = None, start: str = None,
+                         end: str = None, cursor: str = None, limit: int = None):
+    """Stream trades in (date, trade_id) order as NDJSON or CSV, e.g. ?format=csv&asset=BTC&fields=price,volume.
+
+    A page cut off at limit ends with a next_cursor line ({"next_cursor": ...}
+    in NDJSON, "# next_cursor=..." in CSV). Pass it (or a cursor built from
+    the last row received) as ?cursor= to fetch the next page or resume a
+    download.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(EXPORT_FORMATS)}")
+    if limit is not None and limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    try:
+        selected = parse_fields(fields)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    start_date, end_date = _parse_dates(start, end)
+    
+    trades = export_trades(trader_id, selected, export_filters(asset, outcome, start_date, end_date), after, limit)
+    if trades is None:
+        raise HTTPException(status_code=404, detail="Trader not found")
+    
+    if export_format == "csv":
+        chunks = csv_chunks(trades, selected, header=[STORED_TO_CSV_FIELDS.get(f, f) for f in selected],
+                            limit=limit)
+    else:
+        chunks = ndjson_chunks(trades, limit)
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[export_format], headers={
+        "Content-Disposition": f'attachment; filename="trades-{trader_id}.{export_format}"'
+    })
+
+def _trader_with_rollups(trader_id):
+    trader = get_trader_profile(trader_id)
+    if not trader:
+        raise HTTPException(status_code=404, detail="Trader not found")
+    ensure_trade_rollups(trader)
+    return trader
+
+def _parse_dates(*values):
+    try:
+        return [parse_range_date(v) if v else None for v in values]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/trader/{trader_id}/rollups")
+def trader_rollups(trader_id: str, granularity: str = "month", start: str = None, end: str = None,
+                   asset: str = None):
+    """Chart series of per-bucket trade totals, e.g. ?granularity=week&asset=BTC"""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {GRANULARITIES}")
+    start_date, end_date = _parse_dates(start, end)
+    _trader_with_rollups(trader_id)
+    return {"granularity": granularity,
+            "series": get_rollup_series(trader_id, granularity, start_date, end_date, asset)}
+
+@app.get("/trader/{trader_id}/metrics/range")
+def trader_range_metrics(trader_id: str, start: str, end: str, asset: str = None):
+    """Metrics for trades between two dates (inclusive), answered from rollups"""
+    start_date, end_date = _parse_dates(start, end)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    _trader_with_rollups(trader_id)
+    return get_range_metrics(trader_id, start_date, end_date, asset)
+
+@app.get("/trader/{trader_id}/activity")
+def trader_activity(trader_id: str):
+    """Day-of-week x hour-of-day activity heatmap"""
+    _trader_with_rollups(trader_id)
+    histogram = get_activity_histogram(trader_id)
+    return {
+        "days": WEEKDAYS,
+        "hours": list(range(24)),
+        "heatmap": heatmap_matrix(histogram),
+        "unknown_time": {day: hours.get("unknown", 0) for day, hours in histogram.items()},
+        "active_hours": describe_active_hours(histogram)
+    }
+
+@app.get("/metrics/chat")
+def chat_metrics():
+    """Aggregated per-request streaming timings"""
+    return get_summary()
+
 if __name__ == "__main__":
     port = 8000
-    print(f"🚀 Starting Trade Agent on http://localhost:{port}")
-    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
\ No newline at end of file
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    print(f"🚀 Starting Trade Agent on http://localhost:{port} ({workers} worker(s))")
+    if workers > 1:
+        # Each worker is its own process, so caches and job state must live in the shared tier
+        os.environ.setdefault("CACHE_BACKEND", "sqlite")
+        if os.environ["CACHE_BACKEND"] == "memory":
+            print("⚠ CACHE_BACKEND=memory splits caches and job status between workers")
+        uvicorn.run("main:app", host="127.0.0.1", port=port, workers=workers, log_level="warning")
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
\ No newline at end of file
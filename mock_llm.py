@@ -0,0 +1,134 @@
+# mock_llm.py - Local stand-in for the Ollama generate API
+print("Loading mock_llm module...")
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+import uvicorn
+
+# Generation behaviour, configurable through the environment or the CLI
+TOKEN_RATE = float(os.environ.get("MOCK_TOKEN_RATE", "20"))        # tokens per second
+RESPONSE_TOKENS = int(os.environ.get("MOCK_RESPONSE_TOKENS", "120"))
+PROMPT_EVAL_DELAY = float(os.environ.get("MOCK_PROMPT_EVAL_DELAY", "0.2"))  # seconds before first token
+# Reasoning emitted before the answer when the request sets "think": in the
+# "thinking" field like Ollama's think API, or inline as <think> tags
+THINKING_TOKENS = int(os.environ.get("MOCK_THINKING_TOKENS", "0"))
+THINK_FORMAT = os.environ.get("MOCK_THINK_FORMAT", "field")
+
+THOUGHTS = ("Let", "me", "think", "about", "the", "trader's", "history", "first.")
+
+WORDS = ("I", "usually", "trade", "breakouts", "on", "ADA", "and", "BTC", "when",
+         "volume", "spikes,", "and", "I", "cut", "losses", "quickly.")
+
+app = FastAPI()
+
+stats = {
+    "active": 0,
+    "started": 0,
+    "completed": 0,
+    "cancelled": 0,
+    "tokens_sent": 0
+}
+
+def done_chunk(model, started, prompt_eval_ns, eval_count):
+    """Final chunk, with the same timing fields Ollama reports"""
+    total_ns = int((time.perf_counter() - started) * 1e9)
+    return {
+        "model": model,
+        "response": "",
+        "done": True,
+        "total_duration": total_ns,
+        "load_duration": 0,
+        "prompt_eval_count": 200,
+        "prompt_eval_duration": prompt_eval_ns,
+        "eval_count": eval_count,
+        "eval_duration": total_ns - prompt_eval_ns
+    }
+
+def thinking_chunks(model, count):
+    """Reasoning chunks in the configured format"""
+    thoughts = [THOUGHTS[i % len(THOUGHTS)] + " " for i in range(count)]
+    if THINK_FORMAT == "tags":
+        thoughts[0] = "<think>" + thoughts[0]
+        thoughts[-1] += "</think>"
+        return [{"model": model, "response": t, "done": False} for t in thoughts]
+    return [{"model": model, "response": "", "thinking": t, "done": False} for t in thoughts]
+
+async def generate_tokens(model, think=False, num_predict=None, request=None):
+    """Emit NDJSON chunks at TOKEN_RATE, tracking active/cancelled generations.
+
+    Like Ollama, num_predict caps thinking and answer tokens together, and
+    generation stops as soon as the client disconnects.
+    """
+    stats["active"] += 1
+    stats["started"] += 1
+    started = time.perf_counter()
+    sent = 0
+    try:
+        await asyncio.sleep(PROMPT_EVAL_DELAY)
+        prompt_eval_ns = int(PROMPT_EVAL_DELAY * 1e9)
+        chunks = thinking_chunks(model, THINKING_TOKENS) if think and THINKING_TOKENS else []
+        chunks += [{"model": model, "response": WORDS[i % len(WORDS)] + " ", "done": False}
+                   for i in range(RESPONSE_TOKENS)]
+        if num_predict is not None and num_predict >= 0:
+            chunks = chunks[:num_predict]
+        for chunk in chunks:
+            if request is not None and await request.is_disconnected():
+                stats["cancelled"] += 1
+                return
+            yield json.dumps(chunk) + "\n"
+            sent += 1
+            stats["tokens_sent"] += 1
+            await asyncio.sleep(1 / TOKEN_RATE)
+        yield json.dumps(done_chunk(model, started, prompt_eval_ns, sent)) + "\n"
+        stats["completed"] += 1
+    except (asyncio.CancelledError, GeneratorExit):
+        stats["cancelled"] += 1
+        raise
+    finally:
+        stats["active"] -= 1
+
+@app.post("/api/generate")
+async def generate(request: Request, payload: dict):
+    model = payload.get("model", "mock")
+    tokens = generate_tokens(model, payload.get("think", False), payload.get("options", {}).get("num_predict"),
+                             request)
+    if payload.get("stream", True):
+        return StreamingResponse(tokens, media_type="application/x-ndjson")
+
+    text = "".join([chunk async for chunk in tokens])
+    chunks = [json.loads(line) for line in text.splitlines()]
+    result = chunks[-1]
+    result["response"] = "".join(c["response"] for c in chunks)
+    thinking = "".join(c.get("thinking", "") for c in chunks)
+    if thinking:
+        result["thinking"] = thinking
+    return result
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a mock Ollama server")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-rate", type=float, default=TOKEN_RATE)
+    parser.add_argument("--tokens", type=int, default=RESPONSE_TOKENS)
+    parser.add_argument("--prompt-eval-delay", type=float, default=PROMPT_EVAL_DELAY)
+    parser.add_argument("--thinking-tokens", type=int, default=THINKING_TOKENS)
+    parser.add_argument("--think-format", choices=["field", "tags"], default=THINK_FORMAT)
+    args = parser.parse_args()
+
+    TOKEN_RATE = args.token_rate
+    RESPONSE_TOKENS = args.tokens
+    PROMPT_EVAL_DELAY = args.prompt_eval_delay
+    THINKING_TOKENS = args.thinking_tokens
+    THINK_FORMAT = args.think_format
+
+    print(f"🚀 Mock LLM on http://localhost:{args.port}/api/generate ({TOKEN_RATE} tok/s)")
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,432 @@
+# pages.py
+print("Loading pages module...")
+
+import gzip
+import hashlib
+import html
+
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+    print("Warning: brotli not installed, serving gzip only")
+
+# HTML is revalidated on every visit (a cheap 304); versioned assets are cached for a year
+HTML_CACHE_CONTROL = "no-cache"
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+HOME_HTML = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Trade Agent</title>
+        <style>
+            body { font-family: Arial, sans-serif; text-align: center; padding: 50px; }
+            .btn { padding: 15px 30px; margin: 10px; font-size: 18px; cursor: pointer; 
+                   background: #007bff; color: white; border: none; border-radius: 5px; }
+        </style>
+    </head>
+    <body>
+        <h1>Conversational Trade Agent</h1>
+        <p>Welcome! Are you a new or existing user?</p>
+        <button class="btn" onclick="location.href='/new_user'">New User</button>
+        <button class="btn" onclick="location.href='/login'">Existing User</button>
+    </body>
+    </html>
+    """
+
+NEW_USER_HTML = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Register</title>
+        <style>
+            body { font-family: Arial, sans-serif; padding: 20px; max-width: 600px; margin: 0 auto; }
+            .form-group { margin: 15px 0; }
+            label { display: block; margin-bottom: 5px; font-weight: bold; }
+            input, select, textarea { width: 100%; padding: 10px; border: 1px solid #ccc; border-radius: 5px; }
+            .btn { padding: 12px 24px; background: #007bff; color: white; border: none; 
+                   border-radius: 5px; cursor: pointer; font-size: 16px; }
+            .btn:hover { background: #0056b3; }
+        </style>
+    </head>
+    <body>
+        <h2>New User Registration</h2>
+        <form action="/register" method="post" enctype="multipart/form-data">
+            <div class="form-group">
+                <label>Username:</label>
+                <input type="text" name="username" required>
+            </div>
+            
+            <div class="form-group">
+                <label>Password:</label>
+                <input type="password" name="password" required>
+            </div>
+            
+            <div class="form-group">
+                <label>Upload Trade Data (CSV file):</label>
+                <input type="file" name="trade_file" accept=".csv" required>
+            </div>
+            
+            <div class="form-group">
+                <label>Primary Trading Strategy:</label>
+                <select name="primary_strategy">
+                    <option value="Technical">Technical</option>
+                    <option value="Momentum">Momentum</option>
+                    <option value="Value">Value</option>
+                    <option value="Sentiment">Sentiment</option>
+                </select>
+            </div>
+            
+            <div class="form-group">
+                <label>How do you react to losses?</label>
+                <textarea name="loss_reaction" rows="3" placeholder="Describe your typical response..."></textarea>
+            </div>
+            
+            <div class="form-group">
+                <label>Risk Tolerance:</label>
+                <select name="risk_tolerance">
+                    <option value="Medium">Medium</option>
+                    <option value="High">High</option>
+                    <option value="Low">Low</option>
+                </select>
+            </div>
+            
+            <button type="submit" class="btn">Register</button>
+        </form>
+    </body>
+    </html>
+    """
+
+LOGIN_HTML = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Login</title>
+        <style>
+            body { font-family: Arial, sans-serif; padding: 20px; max-width: 400px; margin: 0 auto; }
+            .form-group { margin: 15px 0; }
+            label { display: block; margin-bottom: 5px; font-weight: bold; }
+            input { width: 100%; padding: 10px; border: 1px solid #ccc; border-radius: 5px; }
+            .btn { padding: 12px 24px; background: #007bff; color: white; border: none; 
+                   border-radius: 5px; cursor: pointer; font-size: 16px; }
+        </style>
+    </head>
+    <body>
+        <h2>Login</h2>
+        <form action="/authenticate" method="post">
+            <div class="form-group">
+                <label>Username:</label>
+                <input type="text" name="username" required>
+            </div>
+            <div class="form-group">
+                <label>Password:</label>
+                <input type="password" name="password" required>
+            </div>
+            <button type="submit" class="btn">Login</button>
+        </form>
+    </body>
+    </html>
+    """
+
+CHAT_CSS = """body { font-family: Arial, sans-serif; margin: 0; padding: 20px; }
+.container { max-width: 800px; margin: 0 auto; }
+.chat-box { height: 400px; border: 2px solid #ccc; padding: 15px; 
+            overflow-y: scroll; margin-bottom: 15px; border-radius: 10px; 
+            background: #f9f9f9; }
+.input-area { display: flex; gap: 10px; }
+input { flex: 1; padding: 12px; border: 1px solid #ccc; border-radius: 5px; }
+button { padding: 12px 20px; background: #007bff; color: white; 
+         border: none; border-radius: 5px; cursor: pointer; }
+.message { margin: 10px 0; padding: 12px; border-radius: 8px; }
+.user { background: #007bff; color: white; text-align: right; }
+.agent { background: #e9ecef; }
+"""
+
+CHAT_JS = """const traderId = document.body.dataset.traderId;
+let currentMessageDiv = null;
+
+function sendMessage() {
+    const input = document.getElementById('messageInput');
+    const message = input.value.trim();
+    if (!message) return;
+
+    addMessage(message, 'user');
+    input.value = '';
+
+    // Create agent message div for streaming
+    currentMessageDiv = createAgentMessage();
+
+    // Start streaming
+    startStreaming(message);
+}
+
+function createAgentMessage() {
+    const box = document.getElementById('chatBox');
+    const div = document.createElement('div');
+    div.className = 'message agent';
+    div.innerHTML = '<strong>🤖 Agent:</strong> <span class="content"></span>';
+    box.appendChild(div);
+    box.scrollTop = box.scrollHeight;
+    return div.querySelector('.content');
+}
+
+function startStreaming(message) {
+    fetch('/chat/' + encodeURIComponent(traderId) + '/message', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({'message': message})
+    })
+    .then(response => {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        function readStream() {
+            return reader.read().then(function(result) {
+                if (result.done) return;
+
+                // SSE frames end with a blank line; keep any partial frame for the next read
+                buffer += decoder.decode(result.value, {stream: true});
+                const frames = buffer.split('\\n\\n');
+                buffer = frames.pop();
+
+                for (let frame of frames) {
+                    if (!frame.startsWith('data: ')) continue; // heartbeat comments
+                    try {
+                        const data = JSON.parse(frame.slice(6));
+                        if (data.token) {
+                            currentMessageDiv.textContent += data.token;
+                            document.getElementById('chatBox').scrollTop = document.getElementById('chatBox').scrollHeight;
+                        }
+                        if (data.done) {
+                            return; // Stream completed
+                        }
+                    } catch (e) {
+                        // Ignore parsing errors
+                    }
+                }
+
+                return readStream();
+            });
+        }
+
+        return readStream();
+    })
+    .catch(error => {
+        if (currentMessageDiv) {
+            currentMessageDiv.textContent = 'Error: ' + error.message;
+        }
+    });
+}
+
+function addMessage(text, sender) {
+    const box = document.getElementById('chatBox');
+    const div = document.createElement('div');
+    div.className = `message ${sender}`;
+    div.innerHTML = `<strong>${sender === 'user' ? 'You' : '🤖 Agent'}:</strong> ${text}`;
+    box.appendChild(div);
+    box.scrollTop = box.scrollHeight;
+}
+
+addMessage("Hello! I'm your trading agent. Ask me about my strategy, trades, or decisions!", 'agent');
+"""
+
+CHAT_SHELL = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Trade Agent Chat</title>
+        <link rel="stylesheet" href="/static/chat.css?v=__CSS_VERSION__">
+    </head>
+    <body data-trader-id="__TRADER_ID__">
+        <div class="container">
+            <h2>💬 Chat with Your Trade Agent</h2>
+            <div id="chatBox" class="chat-box"></div>
+            <div class="input-area">
+                <input type="text" id="messageInput" placeholder="Ask about my trading strategy, past trades, preferences..." 
+                       onkeypress="if(event.key==='Enter') sendMessage()">
+                <button onclick="sendMessage()">Send</button>
+            </div>
+        </div>
+        
+        <script src="/static/chat.js?v=__JS_VERSION__"></script>
+    </body>
+    </html>
+    """
+
+REGISTER_STATUS_SHELL = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Registering</title>
+        <style>
+            body { font-family: Arial, sans-serif; padding: 20px; text-align: center; }
+            .status { background: #e9ecef; padding: 20px; border-radius: 5px; margin: 20px 0; }
+            .success { background: #d4edda; }
+            .failed { background: #f8d7da; }
+            progress { width: 60%; height: 20px; }
+            .btn { padding: 12px 24px; background: #007bff; color: white; text-decoration: none; 
+                   border-radius: 5px; display: inline-block; margin: 10px; }
+        </style>
+    </head>
+    <body data-job-id="__JOB_ID__">
+        <div id="status" class="status">
+            <h2 id="title">Processing your trades...</h2>
+            <progress id="progress" max="100" value="0"></progress>
+            <p id="stage">Queued</p>
+        </div>
+        <a id="chatLink" class="btn" style="display: none;">Start Chatting</a>
+        <script src="/static/register.js?v=__JS_VERSION__"></script>
+    </body>
+    </html>
+    """
+
+REGISTER_JS = """const jobId = document.body.dataset.jobId;
+
+function showResult(job) {
+    const status = document.getElementById('status');
+    document.getElementById('progress').value = job.progress;
+    
+    if (job.status === 'done') {
+        status.className = 'status success';
+        document.getElementById('title').textContent = 'Registration Successful!';
+        document.getElementById('stage').innerHTML = '';
+        const processed = document.createElement('p');
+        processed.textContent = job.result.duplicate_file
+            ? 'This file was already uploaded: your ' + job.result.trades + ' trades are up to date'
+            : 'Processed ' + job.result.trades + ' trades (' + job.result.new_trades + ' new, '
+              + job.result.changed_trades + ' updated)';
+        const traderId = document.createElement('p');
+        traderId.textContent = 'Trader ID: ' + job.result.trader_id;
+        status.appendChild(processed);
+        status.appendChild(traderId);
+        const link = document.getElementById('chatLink');
+        link.href = '/chat/' + encodeURIComponent(job.result.trader_id);
+        link.style.display = 'inline-block';
+        return true;
+    }
+    if (job.status === 'failed') {
+        status.className = 'status failed';
+        document.getElementById('title').textContent = 'Registration Failed';
+        document.getElementById('stage').textContent = job.error;
+        return true;
+    }
+    document.getElementById('stage').textContent = job.stage;
+    return false;
+}
+
+function poll() {
+    fetch('/register/status/' + encodeURIComponent(jobId))
+        .then(response => response.json())
+        .then(job => {
+            if (!showResult(job)) setTimeout(poll, 1000);
+        })
+        .catch(() => setTimeout(poll, 2000));
+}
+
+poll();
+"""
+
+def content_hash(body):
+    """Short content hash used for ETags and asset versions"""
+    return hashlib.sha256(body).hexdigest()[:16]
+
+# Each content coding is a different representation, so it gets its own strong ETag
+ETAG_SUFFIXES = {"identity": "", "gzip": "-gz", "br": "-br"}
+
+def build_asset(text, content_type, cache_control, compress=True):
+    """Encode a response body once, with its ETags and precompressed variants"""
+    body = text.encode("utf-8")
+    digest = content_hash(body)
+    asset = {
+        "body": body,
+        "etag": f'"{digest}"',
+        "etags": {coding: f'"{digest}{suffix}"' for coding, suffix in ETAG_SUFFIXES.items()},
+        "content_type": content_type,
+        "cache_control": cache_control,
+        "gzip": None,
+        "br": None
+    }
+    if compress and len(body) >= MIN_COMPRESS_BYTES:
+        asset["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        if brotli is not None:
+            asset["br"] = brotli.compress(body, quality=11)
+    return asset
+
+def etag_matches(if_none_match, etags):
+    """Whether an If-None-Match header matches any of etags (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") in etags for tag in candidates)
+
+def accepted_encodings(accept_encoding):
+    """Content codings the client accepts (ignoring those with q=0)"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+def asset_response(request, asset):
+    """Serve a prebuilt asset with ETag/304 handling and content negotiation"""
+    encodings = accepted_encodings(request.headers.get("accept-encoding"))
+    if asset["br"] is not None and "br" in encodings:
+        coding = "br"
+    elif asset["gzip"] is not None and ("gzip" in encodings or "*" in encodings):
+        coding = "gzip"
+    else:
+        coding = "identity"
+    headers = {
+        "ETag": asset["etags"][coding],
+        "Cache-Control": asset["cache_control"],
+        "Vary": "Accept-Encoding"
+    }
+    # Any variant's tag revalidates: they all carry the same content
+    if etag_matches(request.headers.get("if-none-match"), asset["etags"].values()):
+        return Response(status_code=304, headers=headers)
+
+    if coding == "identity":
+        return Response(content=asset["body"], media_type=asset["content_type"], headers=headers)
+    headers["Content-Encoding"] = coding
+    return Response(content=asset[coding], media_type=asset["content_type"], headers=headers)
+
+# Precompiled at startup
+ASSETS = {
+    "home": build_asset(HOME_HTML, "text/html; charset=utf-8", HTML_CACHE_CONTROL),
+    "new_user": build_asset(NEW_USER_HTML, "text/html; charset=utf-8", HTML_CACHE_CONTROL),
+    "login": build_asset(LOGIN_HTML, "text/html; charset=utf-8", HTML_CACHE_CONTROL),
+    "chat.css": build_asset(CHAT_CSS, "text/css; charset=utf-8", ASSET_CACHE_CONTROL),
+    "chat.js": build_asset(CHAT_JS, "application/javascript; charset=utf-8", ASSET_CACHE_CONTROL),
+    "register.js": build_asset(REGISTER_JS, "application/javascript; charset=utf-8", ASSET_CACHE_CONTROL)
+}
+
+# The chat shell only varies by trader id; asset URLs carry the content hash
+CHAT_TEMPLATE = (CHAT_SHELL
+                 .replace("__CSS_VERSION__", ASSETS["chat.css"]["etag"].strip('"'))
+                 .replace("__JS_VERSION__", ASSETS["chat.js"]["etag"].strip('"')))
+
+REGISTER_STATUS_TEMPLATE = REGISTER_STATUS_SHELL.replace(
+    "__JS_VERSION__", ASSETS["register.js"]["etag"].strip('"'))
+
+def chat_page(trader_id):
+    """Render the per-trader chat shell (small, so left uncompressed)"""
+    text = CHAT_TEMPLATE.replace("__TRADER_ID__", html.escape(trader_id, quote=True))
+    return build_asset(text, "text/html; charset=utf-8", HTML_CACHE_CONTROL, compress=False)
+
+def register_status_page(job_id):
+    """Render the page that follows a queued registration job"""
+    text = REGISTER_STATUS_TEMPLATE.replace("__JOB_ID__", html.escape(job_id, quote=True))
+    return build_asset(text, "text/html; charset=utf-8", HTML_CACHE_CONTROL, compress=False)
+
+print("✓ Pages module loaded successfully")
@@ -0,0 +1,207 @@
+# precompute.py
+print("Loading precompute module...")
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+
+from fastapi.concurrency import run_in_threadpool
+
+from cache import shared_cache, cache_key
+from chat import (CANONICAL_QUESTIONS, classify_intent, specific_filters, build_trader_context, create_prompt,
+                  chat_payload, stream_ollama)
+from database import get_trader_profile
+from generation import generate_parts
+from tags import get_trade_index
+
+# Answers to the common questions are generated in the background while the
+# LLM has no live requests, and served instantly when a matching question comes in
+PRECOMPUTE_ANSWERS = os.environ.get("PRECOMPUTE_ANSWERS", "1") == "1"
+# Seconds without live requests before background generation resumes
+IDLE_SECONDS = float(os.environ.get("PRECOMPUTE_IDLE_SECONDS", "2"))
+ANSWER_TTL_SECONDS = 24 * 3600
+# Longer or more specific questions get a live answer
+MAX_CANONICAL_WORDS = 12
+
+# Live traffic is tracked in the shared cache so every worker's scheduler
+# yields, not only the one serving the request: a worker with live requests
+# keeps this lease renewed, and it lapses PRECOMPUTE_IDLE_SECONDS after the
+# last one ends. Requests only touch in-process state; the lease is read and
+# written off the event loop by the background tasks
+LIVE_LEASE_KEY = "precompute:live"
+LIVE_RENEW_SECONDS = 0.5
+LIVE_POLL_SECONDS = 0.1
+
+_queue = None
+_queued = set()
+_loop = None
+_scheduler = None
+_lease_keeper = None
+_live_requests = 0
+_last_live_at = float("-inf")
+_live_seen = False
+_busy = None
+_arrived = None
+
+def _answer_key(trader_id, data_version, intent):
+    return cache_key("answers", trader_id, data_version, intent)
+
+def canonical_intent(user_message, trade_index=None):
+    """Intent of a message if it is a plain common question that a precomputed answer fits"""
+    if len(user_message.split()) > MAX_CANONICAL_WORDS:
+        return None
+    intent = classify_intent(user_message)
+    if intent and specific_filters(trade_index, user_message, intent):
+        return None
+    return intent
+
+def get_precomputed_answer(trader, intent):
+    """Stored answer for this intent at the trader's current profile version, or None"""
+    answer = shared_cache.get(_answer_key(trader["trader_id"], trader.get("data_version", 0), intent))
+    return answer["answer"] if answer else None
+
+def _renew_live_lease():
+    shared_cache.set(LIVE_LEASE_KEY, os.getpid(), ttl=IDLE_SECONDS + LIVE_RENEW_SECONDS)
+
+@contextmanager
+def live_request():
+    """Mark a live chat request; background generation in every worker yields while any is active"""
+    global _live_requests, _last_live_at, _live_seen
+    _live_requests += 1
+    _live_seen = True
+    if _busy is not None:
+        _busy.set()
+        _arrived.set()
+    try:
+        yield
+    finally:
+        _live_requests -= 1
+        _last_live_at = time.monotonic()
+        if _live_requests == 0 and _busy is not None:
+            _busy.clear()
+
+async def _live_traffic():
+    if _live_requests or time.monotonic() - _last_live_at < IDLE_SECONDS:
+        return True
+    return await run_in_threadpool(shared_cache.get, LIVE_LEASE_KEY) is not None
+
+async def _keep_live_lease():
+    """Publish this worker's live requests: at once when one arrives, then every LIVE_RENEW_SECONDS"""
+    global _live_seen
+    while True:
+        try:
+            await asyncio.wait_for(_arrived.wait(), LIVE_RENEW_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _arrived.clear()
+        # Requests that started and ended since the last renewal count too
+        if _live_requests or _live_seen:
+            _live_seen = False
+            try:
+                await run_in_threadpool(_renew_live_lease)
+            except Exception as e:
+                print(f"✗ Error renewing live request lease: {e}")
+
+async def _wait_until_idle():
+    while await _live_traffic():
+        await asyncio.sleep(LIVE_POLL_SECONDS)
+
+async def _wait_for_live_traffic():
+    # Requests in this worker wake it at once; other workers' are seen through the lease
+    while not await _live_traffic():
+        try:
+            await asyncio.wait_for(_busy.wait(), LIVE_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+async def generate_answer(trader, intent):
+    """Generate and store the answer to an intent's canonical question"""
+    question = CANONICAL_QUESTIONS[intent]
+    profile = trader.get("behavioral_profile", {})
+    trade_index = await run_in_threadpool(get_trade_index, trader)
+    context = build_trader_context(profile.get("profile_features", {}), profile.get("derived_features", {}),
+                                   trader.get("trade_history", []), trader.get("user_responses", {}),
+                                   trade_index, question)
+    tokens = []
+    async for kind, text in generate_parts(stream_ollama(chat_payload(create_prompt(question, context))), {}):
+        if kind == "answer":
+            tokens.append(text)
+
+    answer = "".join(tokens).strip()
+    if answer:
+        shared_cache.set(_answer_key(trader["trader_id"], trader.get("data_version", 0), intent), {
+            "intent": intent,
+            "question": question,
+            "answer": answer,
+            "generated_at": time.time()
+        }, ttl=ANSWER_TTL_SECONDS)
+
+async def _generate_unless_interrupted(trader, intent):
+    """Generate an answer, abandoning it as soon as a live request arrives; True if finished"""
+    generation = asyncio.ensure_future(generate_answer(trader, intent))
+    interrupted = asyncio.ensure_future(_wait_for_live_traffic())
+    done, _ = await asyncio.wait({generation, interrupted}, return_when=asyncio.FIRST_COMPLETED)
+    for task in (generation, interrupted):
+        if task not in done:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+    if generation in done:
+        generation.result()
+        return True
+    return False
+
+async def _precompute_trader(trader_id):
+    trader = await run_in_threadpool(get_trader_profile, trader_id)
+    if not trader:
+        return
+    for intent in CANONICAL_QUESTIONS:
+        if get_precomputed_answer(trader, intent):
+            continue
+        while True:
+            await _wait_until_idle()
+            if await _generate_unless_interrupted(trader, intent):
+                break
+    print(f"✓ Precomputed answers for trader: {trader_id}")
+
+async def _run_scheduler():
+    while True:
+        trader_id = await _queue.get()
+        try:
+            await _precompute_trader(trader_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"✗ Error precomputing answers for {trader_id}: {e}")
+        finally:
+            _queued.discard(trader_id)
+
+def _enqueue(trader_id):
+    if trader_id not in _queued:
+        _queued.add(trader_id)
+        _queue.put_nowait(trader_id)
+
+def start_scheduler():
+    """Start the background scheduler on the running event loop"""
+    global _queue, _loop, _scheduler, _lease_keeper, _busy, _arrived
+    if not PRECOMPUTE_ANSWERS or _scheduler is not None:
+        return
+    _loop = asyncio.get_running_loop()
+    _queue = asyncio.Queue()
+    _busy, _arrived = asyncio.Event(), asyncio.Event()
+    if _live_requests:
+        _busy.set()
+        _arrived.set()
+    _scheduler = _loop.create_task(_run_scheduler())
+    _lease_keeper = _loop.create_task(_keep_live_lease())
+
+def schedule_precompute(trader_id):
+    """Queue a trader for background answer generation; safe to call from any thread"""
+    if _loop is None or _loop.is_closed():
+        return
+    _loop.call_soon_threadsafe(_enqueue, trader_id)
+
+print("✓ Precompute module loaded successfully")
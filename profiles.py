@@ -0,0 +1,27 @@
+# profiles.py
+print("Loading profiles module...")
+
+from datetime import datetime
+
+from derived_metrics import calculate_metrics, ANALYTICS_VERSION
+from behavioral import analyze_behavior
+
+def analysis_stamp():
+    """Record of which analysis rules produced a stored profile"""
+    return {
+        "analytics_version": ANALYTICS_VERSION,
+        "computed_at": datetime.now()
+    }
+
+def is_stale(trader):
+    """Whether a trader's metrics/profile came from an older version of the analysis"""
+    stamp = trader.get("analysis_stamp") or {}
+    return stamp.get("analytics_version") != ANALYTICS_VERSION
+
+def recompute_analysis(trade_rows, user_responses):
+    """Recompute metrics and behavioral profile; trade_rows are in CSV row format"""
+    metrics = calculate_metrics(trade_rows)
+    profile = analyze_behavior(metrics, user_responses or {})
+    return metrics, profile, analysis_stamp()
+
+print("✓ Profiles module loaded successfully")
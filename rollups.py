@@ -0,0 +1,171 @@
+# rollups.py
+print("Loading rollups module...")
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+GRANULARITIES = ["day", "week", "month"]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Hour-of-day ranges used to describe when a trader is active
+DAY_PERIODS = [("Overnight", range(0, 6)), ("Morning", range(6, 12)),
+               ("Afternoon", range(12, 18)), ("Evening", range(18, 24))]
+
+ROLLUP_FIELDS = ["count", "wins", "notional", "duration_total", "duration_count"]
+
+@lru_cache(maxsize=16384)
+def parse_trade_date(value):
+    """Date of a trade from its stored date string, or None if unparseable"""
+    try:
+        return datetime.fromisoformat(str(value).strip()).date()
+    except ValueError:
+        return None
+
+@lru_cache(maxsize=2048)
+def parse_trade_hour(value):
+    """Hour of day from a time_of_trade value such as "14:05", or None"""
+    try:
+        hour = int(str(value).split(":")[0])
+    except ValueError:
+        return None
+    return hour if 0 <= hour < 24 else None
+
+def bucket_of(day, granularity):
+    """Rollup bucket label for a date: 2025-03-17, 2025-W12 (ISO week) or 2025-03"""
+    if granularity == "day":
+        return day.isoformat()
+    if granularity == "week":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularity == "month":
+        return f"{day.year}-{day.month:02d}"
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+def _trade_day(trade):
+    return parse_trade_date(trade.get("date") or trade.get("trade_date") or "")
+
+def build_rollups(trades):
+    """Per (granularity, bucket, asset) totals for a batch of stored trades.
+
+    Totals are additive, so rollups for newly added trades can be applied as
+    increments on top of the stored ones.
+    """
+    rollups = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    for trade in trades:
+        day = _trade_day(trade)
+        if day is None:
+            continue
+        asset = trade.get("asset") or "Unknown"
+        won = (trade.get("outcome") or trade.get("trade_outcome")) == "Profit"
+        notional = float(trade.get("trade_value") or 0)
+        duration = trade.get("trade_duration")
+        for granularity in GRANULARITIES:
+            totals = rollups[(granularity, bucket_of(day, granularity), asset)]
+            totals["count"] += 1
+            totals["wins"] += won
+            totals["notional"] += notional
+            if duration not in (None, ""):
+                totals["duration_total"] += int(duration)
+                totals["duration_count"] += 1
+    return dict(rollups)
+
+def activity_histogram(trades):
+    """Trade counts by day of week and hour of day: {"Monday": {"13": n}}.
+
+    Hours are keyed as strings so the histogram can be stored and incremented
+    in MongoDB as is; trades without a usable time are counted under "unknown".
+    """
+    histogram = defaultdict(lambda: defaultdict(int))
+    for trade in trades:
+        weekday = trade.get("day_of_week")
+        if weekday not in WEEKDAYS:
+            day = _trade_day(trade)
+            if day is None:
+                continue
+            weekday = WEEKDAYS[day.weekday()]
+        hour = parse_trade_hour(trade.get("time_of_trade") or "")
+        histogram[weekday]["unknown" if hour is None else str(hour)] += 1
+    return {weekday: dict(hours) for weekday, hours in histogram.items()}
+
+def heatmap_matrix(histogram):
+    """7 x 24 matrix (Monday first) of trade counts from an activity histogram"""
+    return [[histogram.get(weekday, {}).get(str(hour), 0) for hour in range(24)] for weekday in WEEKDAYS]
+
+def describe_active_hours(histogram):
+    """Short description of when a trader trades, e.g. "Weekday Evenings".
+
+    Histograms where every trade is at 00:00 come from date-only exports, so
+    only the day of week is used for them.
+    """
+    hour_counts = defaultdict(int)
+    weekday_total = weekend_total = 0
+    for weekday, hours in histogram.items():
+        for hour, count in hours.items():
+            if hour != "unknown":
+                hour_counts[int(hour)] += count
+            if weekday in ("Saturday", "Sunday"):
+                weekend_total += count
+            else:
+                weekday_total += count
+
+    total = weekday_total + weekend_total
+    if not total:
+        return "Market Hours"
+
+    if weekend_total / total > 0.5:
+        days = "Weekend"
+    elif weekday_total / total >= 0.9:
+        days = "Weekday"
+    else:
+        days = "All Week"
+
+    if not hour_counts or set(hour_counts) == {0}:
+        return days
+    period_counts = {name: sum(hour_counts[h] for h in hours) for name, hours in DAY_PERIODS}
+    period = max(period_counts, key=period_counts.get)
+    # No period clearly dominating means activity is spread over the day
+    if period_counts[period] / sum(period_counts.values()) < 0.4:
+        return f"{days}, Around the Clock"
+    return f"{days} {period}s"
+
+def plan_range_buckets(start, end):
+    """Fewest rollup buckets exactly covering [start, end]: whole months plus edge days"""
+    buckets = {"day": [], "month": []}
+    day = start
+    while day <= end:
+        if day.day == 1:
+            next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+            if next_month - timedelta(days=1) <= end:
+                buckets["month"].append(bucket_of(day, "month"))
+                day = next_month
+                continue
+        buckets["day"].append(bucket_of(day, "day"))
+        day += timedelta(days=1)
+    return buckets
+
+def combine_rollups(rows):
+    """Summary metrics from a set of rollup rows"""
+    totals = dict.fromkeys(ROLLUP_FIELDS, 0)
+    for row in rows:
+        for field in ROLLUP_FIELDS:
+            totals[field] += row.get(field, 0)
+    count = totals["count"]
+    return {
+        "total_trades": count,
+        "profitable_trades": totals["wins"],
+        "win_rate": round(totals["wins"] / count, 3) if count else 0,
+        "notional": round(totals["notional"], 2),
+        "avg_trade_size": round(totals["notional"] / count, 2) if count else 0,
+        "avg_holding_time": (round(totals["duration_total"] / totals["duration_count"], 2)
+                             if totals["duration_count"] else 0)
+    }
+
+def parse_range_date(value):
+    """Date from a YYYY-MM-DD query parameter"""
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date (expected YYYY-MM-DD): {value}")
+
+print("✓ Rollups module loaded successfully")
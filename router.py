@@ -0,0 +1,89 @@
+# router.py
+print("Loading router module...")
+
+import os
+import re
+
+from chat import MODEL, classify_intent, specific_filters, chat_payload, llm_in_flight
+from generation import THINK
+
+# Answer tiers, cheapest first: a rule-based template, a small fast local
+# model, or the large reasoning model
+TIERS = ["template", "small", "large"]
+MODEL_ROUTING = os.environ.get("MODEL_ROUTING", "1") == "1"
+SMALL_MODEL = os.environ.get("SMALL_MODEL", "llama3.2")  # "" disables the small tier
+
+# Latency budgets: seconds until the first answer token before the tier is abandoned
+TIER_BUDGETS = {
+    "template": 0,
+    "small": float(os.environ.get("SMALL_TTFT_BUDGET", "5")),
+    "large": float(os.environ.get("LARGE_TTFT_BUDGET", "30"))
+}
+
+# Generations in flight (per worker) at which new requests are downgraded a tier
+LARGE_MAX_IN_FLIGHT = int(os.environ.get("LARGE_MAX_IN_FLIGHT", "4"))
+SMALL_MAX_IN_FLIGHT = int(os.environ.get("SMALL_MAX_IN_FLIGHT", "8"))
+
+# Questions that ask for reasoning rather than a fact from the profile
+OPEN_ENDED_MARKERS = ["why", "explain", "compare", "what if", "would you", "should", "walk me through",
+                      "difference", "versus", "vs", "advice", "recommend", "improve", "better", "worse",
+                      "think about", "feel about", "lesson", "mistake"]
+TEMPLATE_MAX_WORDS = 10
+SMALL_MAX_WORDS = 25
+
+def classify_complexity(user_message, trade_index=None):
+    """"simple" (a template answers it), "lookup" (specific but factual) or "open_ended" """
+    words = re.findall(r"[a-z0-9']+", user_message.lower())
+    padded = f" {' '.join(words)} "
+    if len(words) > SMALL_MAX_WORDS or any(f" {marker} " in padded for marker in OPEN_ENDED_MARKERS):
+        return "open_ended"
+    # Questions about particular trades need the matching trades, which templates don't use
+    intent = classify_intent(user_message)
+    if specific_filters(trade_index, user_message, intent):
+        return "lookup"
+    if intent and len(words) <= TEMPLATE_MAX_WORDS:
+        return "simple"
+    return "lookup"
+
+def route_message(user_message, trade_index=None, in_flight=None):
+    """Pick the cheapest tier that can answer a message.
+
+    Returns {"tier", "complexity", "reason", "tiers"}: tiers is the order in
+    which LLM tiers are tried (empty for a template answer), reason is the
+    complexity or "load" when the tier was downgraded because of the number
+    of generations in flight.
+    """
+    complexity = classify_complexity(user_message, trade_index)
+    if not MODEL_ROUTING:
+        return {"tier": "large", "complexity": complexity, "reason": "routing_disabled", "tiers": ["large"]}
+
+    tier = {"simple": "template", "lookup": "small", "open_ended": "large"}[complexity]
+    if tier == "small" and not SMALL_MODEL:
+        tier = "large"
+    reason = complexity
+
+    in_flight = llm_in_flight() if in_flight is None else in_flight
+    if tier == "large" and in_flight >= LARGE_MAX_IN_FLIGHT and SMALL_MODEL:
+        tier, reason = "small", "load"
+    # Only factual questions with a known intent are shed to a template; open-ended
+    # ones keep an LLM answer
+    if (complexity == "lookup" and tier != "template" and in_flight >= SMALL_MAX_IN_FLIGHT
+            and classify_intent(user_message)):
+        tier, reason = "template", "load"
+
+    if tier == "template":
+        tiers = []
+    elif tier == "small":
+        # Escalate when the small model fails, unless it was picked to shed load
+        tiers = ["small"] if reason == "load" else ["small", "large"]
+    else:
+        tiers = ["large", "small"] if SMALL_MODEL else ["large"]
+    return {"tier": tier, "complexity": complexity, "reason": reason, "tiers": tiers}
+
+def tier_payload(prompt, tier):
+    """Ollama request for a prompt on an LLM tier; only the large model reasons"""
+    if tier == "small":
+        return chat_payload(prompt, model=SMALL_MODEL, think=False)
+    return chat_payload(prompt, model=MODEL, think=THINK)
+
+print("✓ Router module loaded successfully")
@@ -0,0 +1,221 @@
+# snapshot.py
+print("Loading snapshot module...")
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from trade_codec import encode_trades
+
+# Local on-disk snapshots of trader documents. Set SNAPSHOT_DIR="" to disable.
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", ".snapshots")
+
+# File layout: magic, header length (uint64), JSON header, then the packed
+# column buffers, each aligned to ALIGNMENT bytes so they can be viewed in place
+MAGIC = b"TRSNAP01"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+DTYPES = {"B": "<u1", "H": "<u2", "I": "<u4", "q": "<i8", "d": "<f8"}
+
+_TRADER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+# Open mappings, least recently read first. An evicted mapping is not closed
+# explicitly: trade views handed out earlier may still use it, and it is
+# unmapped once the last of them is gone
+SNAPSHOT_CACHE_SIZE = 256
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+_open_snapshots = OrderedDict()
+_lock = threading.Lock()
+
+def snapshot_path(trader_id):
+    """Snapshot file for a trader, or None if snapshots are disabled or the id is unsafe"""
+    if not SNAPSHOT_DIR or not _TRADER_ID_PATTERN.match(trader_id or ""):
+        return None
+    return os.path.join(SNAPSHOT_DIR, f"{trader_id}.snap")
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _data_typecode(column):
+    if column["kind"] in ("i8", "seq"):
+        return "q"
+    if column["kind"] == "f8":
+        return "d"
+    return column["typecode"]
+
+def write_snapshot(trader):
+    """Atomically write a snapshot of a trader document (trades as packed columns)"""
+    path = snapshot_path(trader.get("trader_id"))
+    if path is None:
+        return None
+
+    trades = list(trader.get("trade_history", []))
+    encoded = encode_trades(trades)
+
+    # Lay out the binary buffers after the header; the header records their offsets
+    buffers = []
+    columns = {}
+    for field, column in encoded["columns"].items():
+        meta = {k: v for k, v in column.items() if not isinstance(v, bytes)}
+        if "data" in column:
+            meta["data"] = {"dtype": DTYPES[_data_typecode(column)], "index": len(buffers)}
+            buffers.append(column["data"])
+        if "offsets" in column:
+            meta["offsets"] = {"dtype": DTYPES["I"], "index": len(buffers)}
+            buffers.append(column["offsets"])
+        columns[field] = meta
+
+    document = {k: v for k, v in trader.items() if k not in ("_id", "trade_history")}
+    header = {
+        "format_version": FORMAT_VERSION,
+        "trader_id": trader["trader_id"],
+        "data_version": trader.get("data_version", 0),
+        "count": encoded["count"],
+        "fields": encoded["fields"],
+        "columns": columns,
+        "document": document,
+        "buffers": []
+    }
+
+    # Buffer offsets depend on the header size and vice versa; grow the slack until it fits
+    slack = 64
+    while True:
+        offset = _align(len(MAGIC) + 8 + len(json.dumps(header, default=str).encode()) + slack)
+        data_start = offset
+        header["buffers"] = []
+        for buffer in buffers:
+            header["buffers"].append([offset, len(buffer)])
+            offset = _align(offset + len(buffer))
+        header_bytes = json.dumps(header, default=str).encode()
+        if len(MAGIC) + 8 + len(header_bytes) <= data_start:
+            break
+        slack *= 2
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for (offset, _), buffer in zip(header["buffers"], buffers):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(buffer)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+def schedule_snapshot(trader):
+    """Write a snapshot in the background; failures only cost a future cache miss"""
+    def write():
+        try:
+            write_snapshot(trader)
+        except Exception as e:
+            print(f"✗ Error writing snapshot for {trader.get('trader_id')}: {e}")
+    _writer.submit(write)
+
+class SnapshotTrades(Sequence):
+    """Read-only trade list backed by memory-mapped columns; rows are built on access"""
+
+    def __init__(self, header, mapped):
+        self._count = header["count"]
+        self._fields = header["fields"]
+        self._columns = []
+        for field in self._fields:
+            meta = dict(header["columns"][field])
+            for key in ("data", "offsets"):
+                if key in meta:
+                    offset, length = header["buffers"][meta[key]["index"]]
+                    dtype = np.dtype(meta[key]["dtype"])
+                    meta[key] = np.frombuffer(mapped, dtype=dtype, count=length // dtype.itemsize, offset=offset)
+            meta["nulls"] = set(meta.get("nulls", []))
+            self._columns.append(meta)
+
+    def __len__(self):
+        return self._count
+
+    def _value(self, column, i):
+        kind = column["kind"]
+        if kind == "f8":
+            value = float(column["data"][i])
+            return None if value != value else value
+        if kind == "i8":
+            return None if i in column["nulls"] else int(column["data"][i])
+        if kind == "dict":
+            return column["values"][column["data"][i]]
+        if kind == "seq":
+            return column["prefix"] + str(int(column["data"][i]))
+        if kind == "tags":
+            offsets = column["offsets"]
+            return [column["values"][t] for t in column["data"][offsets[i]:offsets[i + 1]]]
+        return column["values"][i]
+
+    def _row(self, i):
+        return {field: self._value(column, i) for field, column in zip(self._fields, self._columns)}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("trade index out of range")
+        return self._row(index)
+
+def _open_snapshot(path):
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a trade snapshot")
+    (header_length,) = struct.unpack_from("<Q", mapped, len(MAGIC))
+    start = len(MAGIC) + 8
+    header = json.loads(mapped[start:start + header_length])
+    if header.get("format_version") != FORMAT_VERSION:
+        raise ValueError("unsupported snapshot format")
+    return header, SnapshotTrades(header, mapped)
+
+def load_snapshot(trader_id, data_version):
+    """Trader document from a snapshot written at data_version, or None if missing/stale"""
+    path = snapshot_path(trader_id)
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    key = (stat.st_ino, stat.st_mtime_ns)
+    with _lock:
+        cached = _open_snapshots.get(trader_id)
+        if cached is not None:
+            _open_snapshots.move_to_end(trader_id)
+    if cached is None or cached[0] != key:
+        try:
+            header, trades = _open_snapshot(path)
+        except Exception as e:
+            print(f"✗ Ignoring unreadable snapshot {path}: {e}")
+            return None
+        cached = (key, header, trades)
+        with _lock:
+            _open_snapshots[trader_id] = cached
+            _open_snapshots.move_to_end(trader_id)
+            while len(_open_snapshots) > SNAPSHOT_CACHE_SIZE:
+                _open_snapshots.popitem(last=False)
+
+    _, header, trades = cached
+    if header["data_version"] != data_version:
+        return None
+    trader = dict(header["document"])
+    trader["trade_history"] = trades
+    return trader
+
+print("✓ Snapshot module loaded successfully")
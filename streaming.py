@@ -0,0 +1,139 @@
+# streaming.py
+print("Loading streaming module...")
+
+import asyncio
+import json
+import os
+from json.encoder import encode_basestring_ascii
+
+import anyio
+from fastapi.responses import StreamingResponse
+
+# Coalescing budget: a frame is flushed when it is this old or this large
+FLUSH_INTERVAL = float(os.environ.get("STREAM_FLUSH_INTERVAL", "0.03"))   # seconds
+FLUSH_BYTES = int(os.environ.get("STREAM_FLUSH_BYTES", "256"))
+HEARTBEAT_INTERVAL = float(os.environ.get("STREAM_HEARTBEAT_INTERVAL", "15"))  # seconds
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+    "Access-Control-Allow-Origin": "*",
+}
+
+HEARTBEAT_FRAME = b": ping\n\n"
+
+def token_frame(text):
+    """Preformatted SSE frame for a run of token text (no dict + dumps per token)"""
+    return ('data: {"token": ' + encode_basestring_ascii(text) + '}\n\n').encode()
+
+def event_frame(payload):
+    """SSE frame for a control event such as the final done event"""
+    return ("data: " + json.dumps(payload) + "\n\n").encode()
+
+async def wait_for_disconnect(request):
+    """Return once the client has gone away (the request body must already be read)"""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def coalesce_frames(events, flush_interval=FLUSH_INTERVAL, max_bytes=FLUSH_BYTES,
+                          heartbeat_interval=HEARTBEAT_INTERVAL, disconnected=None):
+    """Turn an async stream of tokens (str) and events (dict) into SSE frames.
+
+    Tokens are buffered and written as one frame once the oldest buffered
+    token is flush_interval old or the buffer reaches max_bytes. Events flush
+    the buffer and go out immediately. A heartbeat comment is written when
+    nothing has been sent for heartbeat_interval seconds.
+
+    If disconnected (an awaitable) completes, the stream stops at once and
+    the source is closed, even while it is waiting on upstream, rather than
+    on the next failed write.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    watcher = asyncio.ensure_future(disconnected) if disconnected is not None else None
+    pending = None
+    buffer = []
+    buffered_bytes = 0
+    flush_at = None
+    last_write = loop.time()
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            wake_at = flush_at if buffer else last_write + heartbeat_interval
+            waiting = {pending, watcher} if watcher else {pending}
+            done, _ = await asyncio.wait(waiting, timeout=max(0, wake_at - loop.time()),
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if watcher in done:
+                return
+
+            if not done:
+                if buffer:
+                    yield token_frame("".join(buffer))
+                    buffer, buffered_bytes = [], 0
+                else:
+                    yield HEARTBEAT_FRAME
+                last_write = loop.time()
+                continue
+
+            task, pending = pending, None
+            try:
+                item = task.result()
+            except StopAsyncIteration:
+                break
+
+            if isinstance(item, str):
+                if not buffer:
+                    flush_at = loop.time() + flush_interval
+                buffer.append(item)
+                buffered_bytes += len(item)
+                if buffered_bytes < max_bytes:
+                    continue
+                yield token_frame("".join(buffer))
+                buffer, buffered_bytes = [], 0
+            else:
+                if buffer:
+                    yield token_frame("".join(buffer))
+                    buffer, buffered_bytes = [], 0
+                yield event_frame(item)
+            last_write = loop.time()
+
+        if buffer:
+            yield token_frame("".join(buffer))
+    finally:
+        for task in (pending, watcher):
+            if task is not None:
+                task.cancel()
+                # Not "await task": that would forward any further cancellation
+                # of this stream into the task and interrupt its cleanup (closing
+                # the upstream connection) part way through
+                await asyncio.wait({task})
+                if not task.cancelled():
+                    task.exception()
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+class EventStreamResponse(StreamingResponse):
+    """SSE response that closes its frame source as soon as streaming stops.
+
+    On a disconnect Starlette cancels the response while it may be blocked in
+    send(), which would leave the source suspended until garbage collection;
+    closing it here (shielded from that cancellation) releases the upstream
+    generation immediately.
+    """
+
+    media_type = "text/event-stream"
+
+    async def stream_response(self, send):
+        try:
+            await super().stream_response(send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+print("✓ Streaming module loaded successfully")
@@ -0,0 +1,106 @@
+# synthetic_data.py
+print("Loading synthetic_data module...")
+
+import argparse
+import csv
+import io
+import random
+from datetime import datetime, timedelta
+
+# Column order of the exported trade CSVs (see user-001.csv); the first
+# column is the unnamed pandas index
+CSV_COLUMNS = [
+    "", "user_id", "trade_id", "asset", "action", "price", "volume", "trade_value",
+    "trade_date", "trade_outcome", "tags", "trade_duration", "capital_used",
+    "stop_loss", "take_profit", "entry_reason", "exit_reason", "market_condition",
+    "indicator_signals_used", "news_or_sentiment_reference", "trading_platform",
+    "trade_type", "time_of_trade", "day_of_week"
+]
+
+ASSETS = ["BTC", "ETH", "ADA", "LINK", "MATIC", "DOGE", "PEPE", "SOL", "XRP", "DOT"]
+ACTIONS = ["Buy", "Sell"]
+OUTCOMES = ["Profit", "Loss", "Neutral"]
+TAGS = [
+    "breakout", "community driven", "meme", "panic sell", "RSI", "stop-loss",
+    "MACD", "event-based", "hype", "FOMO", "whale alert", "support bounce"
+]
+ENTRY_REASONS = ["volume spike", "technical setup", "oversold", "news breakout", "social trend"]
+EXIT_REASONS = ["indicator signal", "panic exit", "hit stop loss", "take profit", "trend reversal"]
+MARKET_CONDITIONS = ["Bullish", "Bearish", "Neutral"]
+INDICATORS = ["Volume", "RSI", "Bollinger Bands", "MACD", ""]
+NEWS_SOURCES = ["Twitter", "Reddit", "Telegram", "News Feed", ""]
+PLATFORMS = ["Coinbase", "KuCoin", "Bitfinex", "Kraken", "Binance"]
+TRADE_TYPES = ["Automated", "Signal-based", "Manual"]
+
+START_DATE = datetime(2025, 1, 1)
+DATE_RANGE_DAYS = 211  # 2025-01-01 .. 2025-07-30
+
+def format_tags(tags):
+    """Format a tag list the way the exports do (a Python list literal)"""
+    return "[" + ", ".join(f"'{tag}'" for tag in tags) + "]"
+
+def iter_trades(n, seed=42, user_id="U001"):
+    """Yield n synthetic raw CSV rows (all values as strings, like csv.DictReader)"""
+    rng = random.Random(seed)
+
+    for i in range(n):
+        price = rng.uniform(1000, 40000)
+        volume = rng.uniform(500, 10000)
+        trade_value = price * volume
+        trade_date = START_DATE + timedelta(days=rng.randrange(DATE_RANGE_DAYS))
+
+        yield {
+            "": str(i),
+            "user_id": user_id,
+            "trade_id": f"{user_id}_T{i + 1}",
+            "asset": rng.choice(ASSETS),
+            "action": rng.choice(ACTIONS),
+            "price": f"{price:.2f}",
+            "volume": f"{volume:.2f}",
+            "trade_value": f"{trade_value:.2f}",
+            "trade_date": trade_date.strftime("%Y-%m-%d %H:%M:%S"),
+            "trade_outcome": rng.choice(OUTCOMES),
+            "tags": format_tags(rng.sample(TAGS, rng.randint(1, 3))),
+            "trade_duration": str(rng.randint(1, 100)),
+            "capital_used": f"{trade_value * rng.uniform(0.8, 1.1):.2f}",
+            "stop_loss": f"{price * rng.uniform(0.9, 0.99):.2f}",
+            "take_profit": f"{price * rng.uniform(1.02, 1.2):.2f}",
+            "entry_reason": rng.choice(ENTRY_REASONS),
+            "exit_reason": rng.choice(EXIT_REASONS),
+            "market_condition": rng.choice(MARKET_CONDITIONS),
+            "indicator_signals_used": rng.choice(INDICATORS),
+            "news_or_sentiment_reference": rng.choice(NEWS_SOURCES),
+            "trading_platform": rng.choice(PLATFORMS),
+            "trade_type": rng.choice(TRADE_TYPES),
+            "time_of_trade": f"{rng.randrange(24):02d}:{rng.randrange(60):02d}",
+            "day_of_week": trade_date.strftime("%A")
+        }
+
+def generate_trades(n, seed=42, user_id="U001"):
+    """Generate n synthetic raw CSV rows as a list"""
+    return list(iter_trades(n, seed, user_id))
+
+def write_csv(out, n, seed=42, user_id="U001"):
+    """Stream n synthetic trades as CSV to a file object"""
+    writer = csv.DictWriter(out, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    for row in iter_trades(n, seed, user_id):
+        writer.writerow(row)
+
+def generate_csv(n, seed=42, user_id="U001"):
+    """Generate n synthetic trades as CSV text, ready for /register"""
+    out = io.StringIO()
+    write_csv(out, n, seed, user_id)
+    return out.getvalue()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic trade CSV")
+    parser.add_argument("rows", type=float, help="Number of trades, e.g. 1e5")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--user-id", default="U001")
+    parser.add_argument("--output", default="synthetic_trades.csv")
+    args = parser.parse_args()
+
+    with open(args.output, "w", newline="") as f:
+        write_csv(f, int(args.rows), args.seed, args.user_id)
+    print(f"✓ Wrote {int(args.rows)} trades to {args.output}")
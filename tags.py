@@ -0,0 +1,163 @@
+# tags.py
+print("Loading tags module...")
+
+import re
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+
+import numpy as np
+
+from cache import shared_cache, cache_key
+
+# Quoted items of a Python list literal such as "['breakout', 'community driven']"
+_QUOTED_ITEM = re.compile(r"""'((?:[^'\\]|\\.)*)'|"((?:[^"\\]|\\.)*)\"""")
+_WHITESPACE = re.compile(r"\s+")
+_ESCAPE = re.compile(r"\\(.)")
+
+# Trade fields (besides tags) that can be combined in index queries
+INDEXED_FIELDS = [
+    "asset", "action", "outcome", "market_condition", "trading_platform", "trade_type",
+    "entry_reason", "exit_reason", "indicator_signals_used", "news_or_sentiment_reference",
+    "day_of_week"
+]
+
+# Per-process cache of built indexes, keyed by (trader_id, data_version), in
+# front of the shared cache so workers build each index only once
+INDEX_CACHE_SIZE = 128
+INDEX_TTL_SECONDS = 3600
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+
+@lru_cache(maxsize=4096)
+def normalize_tag(tag):
+    """Trim and collapse whitespace; interned so repeated tags share one string"""
+    return sys.intern(_WHITESPACE.sub(" ", tag).strip())
+
+@lru_cache(maxsize=4096)
+def _parse_tag_string(raw):
+    text = raw.strip()
+    if text.startswith("[") and text.endswith("]"):
+        text = text[1:-1]
+
+    if "'" in text or '"' in text:
+        items = [_ESCAPE.sub(r"\1", single or double) for single, double in _QUOTED_ITEM.findall(text)]
+    else:
+        items = text.split(",")
+
+    tags = []
+    for item in items:
+        tag = normalize_tag(item)
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tuple(tags)
+
+def parse_tags(raw):
+    """Parse tags from a CSV cell (a Python list literal or comma separated) without eval"""
+    if raw is None:
+        return []
+    if isinstance(raw, (list, tuple)):
+        return clean_tags(raw)
+    return list(_parse_tag_string(str(raw)))
+
+def clean_tags(tags):
+    """Normalize a stored tag list, repairing lists that were split on commas inside a literal"""
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        return parse_tags(tags)
+    if any(isinstance(t, str) and (t[:1] in "['\"" or t[-1:] in "]'\"") for t in tags):
+        return list(_parse_tag_string(", ".join(str(t) for t in tags)))
+    return list(dict.fromkeys(normalize_tag(t) for t in tags if isinstance(t, str) and t.strip()))
+
+@lru_cache(maxsize=4096)
+def index_key(value):
+    """Case-insensitive key used for index lookups"""
+    return normalize_tag(str(value)).lower()
+
+def _to_bitmap(positions, count):
+    bits = np.zeros(count, dtype=bool)
+    bits[positions] = True
+    return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+def bitmap_positions(bitmap, count):
+    """Trade positions set in a bitmap, in ascending order"""
+    if not bitmap:
+        return []
+    packed = np.frombuffer(bitmap.to_bytes((count + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(packed, bitorder="little")[:count].nonzero()[0].tolist()
+
+def build_trade_index(trades):
+    """Bitmap index from tag and categorical values to trade positions"""
+    count = len(trades)
+    positions = {field: defaultdict(list) for field in ["tags"] + INDEXED_FIELDS}
+    labels = {field: {} for field in positions}
+
+    for i, trade in enumerate(trades):
+        for field in INDEXED_FIELDS:
+            value = trade.get(field)
+            if value:
+                positions[field][value].append(i)
+        for tag in clean_tags(trade.get("tags")):
+            positions["tags"][tag].append(i)
+
+    # Merge raw values that share a case-insensitive key
+    bitmaps = {}
+    for field, values in positions.items():
+        merged = defaultdict(list)
+        for value, value_positions in values.items():
+            key = index_key(value)
+            merged[key].extend(value_positions)
+            labels[field].setdefault(key, value)
+        bitmaps[field] = {key: _to_bitmap(p, count) for key, p in merged.items()}
+
+    return {"count": count, "bitmaps": bitmaps, "labels": labels}
+
+def get_trade_index(trader):
+    """Index for a trader document, cached per trader and data version"""
+    key = (trader.get("trader_id"), trader.get("data_version", 0))
+    with _index_lock:
+        if key in _index_cache:
+            _index_cache.move_to_end(key)
+            return _index_cache[key]
+
+    shared_key = cache_key("trade_index", *key)
+    index = shared_cache.get(shared_key)
+    if index is None:
+        index = build_trade_index(trader.get("trade_history", []))
+        shared_cache.set(shared_key, index, ttl=INDEX_TTL_SECONDS)
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+def query_trade_index(index, filters):
+    """Positions of trades matching every field filter (any of the values within a field)"""
+    count = index["count"]
+    result = (1 << count) - 1
+    for field, values in filters.items():
+        if field not in index["bitmaps"]:
+            raise ValueError(f"Field is not indexed: {field}")
+        if isinstance(values, str):
+            values = [values]
+        matches = 0
+        for value in values:
+            matches |= index["bitmaps"][field].get(index_key(value), 0)
+        result &= matches
+        if not result:
+            return []
+    return bitmap_positions(result, count)
+
+def filters_mentioned(index, message):
+    """Index filters whose values are mentioned in a free-text message"""
+    text = message.lower()
+    filters = {}
+    for field, labels in index["labels"].items():
+        for key in labels:
+            if re.search(r"\b" + re.escape(key), text):
+                filters.setdefault(field, []).append(key)
+    return filters
+
+print("✓ Tags module loaded successfully")
@@ -0,0 +1,104 @@
+# telemetry.py
+print("Loading telemetry module...")
+
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+# Rolling window of recent requests kept for the server-side aggregate
+WINDOW_SIZE = 1000
+
+TIMING_FIELDS = [
+    "queue_ms", "profile_fetch_ms", "context_build_ms", "slot_wait_ms", "upstream_connect_ms",
+    "ttft_ms", "generation_ms", "total_ms", "token_count", "tokens_per_sec",
+    "prompt_eval_ms", "eval_ms", "thinking_tokens", "thinking_chars"
+]
+
+_lock = threading.Lock()
+_window = {field: deque(maxlen=WINDOW_SIZE) for field in TIMING_FIELDS}
+_counters = Counter()
+# Latency per answer tier (template, small, large), to compare the tiers
+TIER_FIELDS = ["ttft_ms", "total_ms"]
+_tier_window = defaultdict(lambda: {field: deque(maxlen=WINDOW_SIZE) for field in TIER_FIELDS})
+
+def elapsed_ms(since):
+    """Milliseconds elapsed since a time.perf_counter() reading"""
+    return round((time.perf_counter() - since) * 1000, 2)
+
+def ollama_stats(chunk):
+    """Extract Ollama's own timing stats (reported in ns) from the final chunk"""
+    stats = {}
+    for field in ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration"):
+        if chunk.get(field) is not None:
+            stats[field.replace("_duration", "_ms")] = round(chunk[field] / 1e6, 2)
+    for field in ("prompt_eval_count", "eval_count"):
+        if chunk.get(field) is not None:
+            stats[field] = chunk[field]
+    return stats
+
+def finish_timings(timings, request_start, first_token_at):
+    """Fill in total time and generation throughput once a stream has ended"""
+    now = time.perf_counter()
+    timings["total_ms"] = round((now - request_start) * 1000, 2)
+    if first_token_at is not None:
+        generation = now - first_token_at
+        timings["generation_ms"] = round(generation * 1000, 2)
+        if generation > 0:
+            timings["tokens_per_sec"] = round(timings.get("token_count", 0) / generation, 2)
+
+    ollama = timings.get("ollama", {})
+    if "prompt_eval_ms" in ollama:
+        timings["prompt_eval_ms"] = ollama["prompt_eval_ms"]
+    if "eval_ms" in ollama:
+        timings["eval_ms"] = ollama["eval_ms"]
+    return timings
+
+def record_request(trader_id, timings):
+    """Log one request's timings and add them to the server-side aggregate"""
+    print(f"chat_timing trader={trader_id} {json.dumps(timings)}")
+    with _lock:
+        _counters["requests"] += 1
+        _counters[f"source:{timings.get('source', 'unknown')}"] += 1
+        if timings.get("stop_reason"):
+            _counters[f"stop:{timings['stop_reason']}"] += 1
+        if timings.get("tier"):
+            _counters[f"tier:{timings['tier']}"] += 1
+            _counters[f"route:{timings.get('route_reason', 'unknown')}"] += 1
+            for field in TIER_FIELDS:
+                if timings.get(field) is not None:
+                    _tier_window[timings["tier"]][field].append(timings[field])
+        for field in TIMING_FIELDS:
+            value = timings.get(field)
+            if value is not None:
+                _window[field].append(value)
+
+def _percentile(ordered, pct):
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+def _describe(ordered):
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "p50": _percentile(ordered, 50),
+        "p95": _percentile(ordered, 95),
+        "p99": _percentile(ordered, 99)
+    }
+
+def get_summary():
+    """Aggregate of this worker's recent request window: mean and p50/p95/p99 per timing and per tier"""
+    with _lock:
+        windows = {field: sorted(values) for field, values in _window.items() if values}
+        tier_windows = {tier: {field: sorted(values) for field, values in fields.items() if values}
+                        for tier, fields in _tier_window.items()}
+        counters = dict(_counters)
+
+    summary = {field: _describe(ordered) for field, ordered in windows.items()}
+    tiers = {tier: {field: _describe(ordered) for field, ordered in fields.items()}
+             for tier, fields in tier_windows.items()}
+    return {"worker_pid": os.getpid(), "counters": counters, "timings": summary, "tiers": tiers}
+
+print("✓ Telemetry module loaded successfully")
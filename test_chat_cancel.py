@@ -0,0 +1,85 @@
+# test_chat_cancel.py - A client disconnect must stop the upstream generation
+import asyncio
+import json
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+import pytest
+import uvicorn
+
+import chat
+import main
+import mock_llm
+
+# Seconds within which the mock LLM must see the generation cancelled
+CANCEL_BOUND = 2.0
+# Open-ended, so it is routed to an LLM tier rather than answered from a template
+CANCEL_QUESTION = "Walk me through what you were thinking on your last few trades"
+
+TRADER = {
+    "trader_id": "cancel-test",
+    "data_version": 1,
+    "behavioral_profile": {},
+    "trade_history": [],
+    "user_responses": {}
+}
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@contextmanager
+def serve(app):
+    """Run an app under uvicorn in a background thread; yields its base URL"""
+    port = _free_port()
+    # No lifespan: the app's startup hooks need MongoDB
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Server did not start")
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+@pytest.fixture
+def app_url(monkeypatch):
+    monkeypatch.setattr(main, "get_trader_profile", lambda trader_id: dict(TRADER, trader_id=trader_id))
+    with serve(mock_llm.app) as mock_url:
+        monkeypatch.setattr(chat, "OLLAMA_URL", f"{mock_url}/api/generate")
+        # The upstream client is bound to the app server's event loop
+        monkeypatch.setattr(chat, "_async_client", None)
+        with serve(main.app) as url:
+            yield url
+
+async def _disconnect_after_first_token(url):
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        async with client.stream("POST", "/chat/cancel-test/message", json={"message": CANCEL_QUESTION}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: ") and json.loads(line[6:]).get("token"):
+                    return
+
+def test_disconnect_stops_upstream_generation(app_url):
+    before = dict(mock_llm.stats)
+    asyncio.run(_disconnect_after_first_token(app_url))
+    disconnected_at = time.monotonic()
+
+    while time.monotonic() - disconnected_at < CANCEL_BOUND:
+        if mock_llm.stats["cancelled"] > before["cancelled"] and mock_llm.stats["active"] == 0:
+            break
+        time.sleep(0.01)
+
+    assert mock_llm.stats["started"] > before["started"]
+    assert mock_llm.stats["cancelled"] > before["cancelled"]
+    assert mock_llm.stats["active"] == 0
+    assert mock_llm.stats["completed"] == before["completed"]
@@ -0,0 +1,20 @@
+# test_export.py - A CSV page cut off at its limit carries a continuation token
+from export import CSV_CURSOR_PREFIX, csv_chunks, decode_cursor
+from ingest import parse_trade_csv
+
+TRADES = [{"date": f"2025-01-0{i}", "trade_id": f"T{i}", "asset": "BTC"} for i in range(1, 4)]
+FIELDS = ["date", "trade_id", "asset"]
+
+def test_truncated_csv_page_ends_with_cursor():
+    text = "".join(csv_chunks(iter(TRADES[:2]), FIELDS, limit=2))
+    last_line = text.splitlines()[-1]
+    assert last_line.startswith(CSV_CURSOR_PREFIX)
+    assert decode_cursor(last_line[len(CSV_CURSOR_PREFIX):]) == ("2025-01-02", "T2")
+
+def test_complete_csv_export_has_no_cursor():
+    text = "".join(csv_chunks(iter(TRADES), FIELDS, limit=5))
+    assert CSV_CURSOR_PREFIX not in text
+
+def test_cursor_line_is_dropped_on_upload():
+    text = "".join(csv_chunks(iter(TRADES[:2]), FIELDS, limit=2))
+    assert [row["trade_id"] for row in parse_trade_csv(text)] == ["T1", "T2"]
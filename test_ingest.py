@@ -0,0 +1,91 @@
+# test_ingest.py - Re-uploads against in-memory stand-ins for the MongoDB collections
+import copy
+
+import pytest
+
+import database
+import ingest
+from derived_metrics import ANALYTICS_VERSION
+from synthetic_data import generate_csv
+
+USER = {"username": "resync", "password": "secret", "primary_strategy": "Swing Trading",
+        "loss_reaction": "Hold and wait", "risk_tolerance": "Medium"}
+
+class FakeCollection:
+    """The equality-filter subset of a pymongo collection that registration uses"""
+
+    def __init__(self):
+        self.documents = []
+
+    def _matches(self, document, query):
+        return all(document.get(field) == value for field, value in query.items())
+
+    def find_one(self, query, projection=None):
+        match = next((d for d in self.documents if self._matches(d, query)), None)
+        return copy.deepcopy(match)
+
+    def find(self, query, projection=None):
+        return FakeCursor([copy.deepcopy(d) for d in self.documents if self._matches(d, query)])
+
+    def insert_one(self, document):
+        self.documents.append(copy.deepcopy(document))
+
+    def insert_many(self, documents, ordered=True):
+        self.documents.extend(copy.deepcopy(documents))
+
+    def update_one(self, query, update, upsert=False):
+        document = next((d for d in self.documents if self._matches(d, query)), None)
+        if document is None:
+            if not upsert:
+                return FakeResult(0)
+            document = dict(query)
+            self.documents.append(document)
+        document.update(copy.deepcopy(update.get("$set", {})))
+        for field in update.get("$unset", {}):
+            document.pop(field, None)
+        for field, amount in update.get("$inc", {}).items():
+            document[field] = document.get(field, 0) + amount
+        return FakeResult(1)
+
+class FakeCursor(list):
+    def batch_size(self, size):
+        return self
+
+class FakeResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+class InlineExecutor:
+    """Runs background write-backs at once, so they always land before the re-sync's write"""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+@pytest.fixture
+def traders(monkeypatch):
+    collections = {name: FakeCollection() for name in
+                   ("traders_collection", "users_collection", "fingerprints_collection", "uploads_collection")}
+    for name, collection in collections.items():
+        monkeypatch.setattr(database, name, collection)
+    monkeypatch.setattr(database, "load_snapshot", lambda trader_id, data_version: None)
+    monkeypatch.setattr(database, "schedule_snapshot", lambda trader: None)
+    monkeypatch.setattr(database, "_refresh_executor", InlineExecutor())
+    # Rollups are covered by their own bulk writes; not what this exercises
+    for name in ("build_trade_rollups", "ensure_trade_rollups", "store_trade_rollups"):
+        monkeypatch.setattr(ingest, name, lambda *args, **kwargs: None)
+    return collections["traders_collection"]
+
+def test_stale_trader_reupload(traders):
+    trader_id = ingest.process_registration(USER, generate_csv(20))["trader_id"]
+    document = traders.documents[0]
+    document["analysis_stamp"] = {"analytics_version": ANALYTICS_VERSION - 1}
+    version = document["data_version"]
+
+    result = ingest.process_registration(USER, generate_csv(21))
+
+    assert result["trader_id"] == trader_id
+    assert result["new_trades"] == 1
+    assert document["trade_count"] == 21
+    assert document["analysis_stamp"]["analytics_version"] == ANALYTICS_VERSION
+    # Only the re-sync wrote the trader
+    assert document["data_version"] == version + 1
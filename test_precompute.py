@@ -0,0 +1,14 @@
+# test_precompute.py - Every canonical question must be answerable from its precomputed answer
+import pytest
+
+from chat import CANONICAL_QUESTIONS, classify_intent
+from precompute import canonical_intent
+
+@pytest.mark.parametrize("intent, question", CANONICAL_QUESTIONS.items())
+def test_canonical_question_maps_to_its_intent(intent, question, trade_index):
+    assert classify_intent(question) == intent
+    assert canonical_intent(question, trade_index) == intent
+
+def test_specific_questions_are_not_canonical(trade_index):
+    assert canonical_intent("How do you handle losses on ETH?", trade_index) is None
+    assert canonical_intent("Tell me about your recent buys on Binance.", trade_index) is None
@@ -0,0 +1,19 @@
+# test_router.py - Common questions get the template tier unless they ask about specific trades
+import pytest
+
+from chat import CANONICAL_QUESTIONS
+from router import route_message
+
+@pytest.mark.parametrize("question", CANONICAL_QUESTIONS.values())
+def test_canonical_questions_route_to_template(question, trade_index):
+    assert route_message(question, trade_index, in_flight=0)["tier"] == "template"
+
+@pytest.mark.parametrize("question", ["How do you handle losses?", "Tell me about your recent buys",
+                                      "When do you sell?"])
+def test_intent_keywords_are_not_specific(question, trade_index):
+    assert route_message(question, trade_index, in_flight=0)["tier"] == "template"
+
+def test_questions_about_specific_trades_are_lookups(trade_index):
+    route = route_message("How did your ETH sells on Binance go?", trade_index, in_flight=0)
+    assert route["complexity"] == "lookup"
+    assert route["tier"] != "template"
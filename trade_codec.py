@@ -0,0 +1,150 @@
+# trade_codec.py
+print("Loading trade_codec module...")
+
+import math
+import os
+import sys
+from array import array
+
+# Column-oriented, dictionary-encoded storage for a trader's trade history.
+# Each column is encoded by the most compact kind that round-trips its values:
+#   f8    - floats (None as NaN), packed little-endian float64
+#   i8    - integers, packed int64, with the positions of any None values
+#   dict  - low-cardinality strings, a value dictionary plus packed codes
+#   tags  - lists of strings, a tag dictionary plus packed ids and offsets
+#   seq   - ids sharing a prefix with an integer suffix (e.g. U001_T17), packed int64
+#   plain - anything else, stored as a list
+ENCODING = "columnar-v1"
+
+FIELD_ORDER = [
+    "trade_id", "asset", "action", "price", "volume", "trade_value", "date",
+    "outcome", "tags", "trade_duration", "capital_used", "stop_loss", "take_profit",
+    "entry_reason", "exit_reason", "market_condition", "indicator_signals_used",
+    "news_or_sentiment_reference", "trading_platform", "trade_type",
+    "time_of_trade", "day_of_week"
+]
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+def _pack(typecode, values):
+    packed = array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+def _unpack(typecode, data):
+    unpacked = array(typecode)
+    unpacked.frombytes(data)
+    if sys.byteorder == "big":
+        unpacked.byteswap()
+    return unpacked
+
+def _code_typecode(size):
+    """Smallest unsigned typecode able to index a dictionary of this size"""
+    if size <= 0xFF:
+        return "B"
+    if size <= 0xFFFF:
+        return "H"
+    return "I"
+
+def _common_prefix(values):
+    prefix = os.path.commonprefix(values)
+    return prefix.rstrip("0123456789")
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def encode_column(values):
+    """Encode one column of values"""
+    present = [v for v in values if v is not None]
+
+    if present and all(_is_number(v) for v in present):
+        if all(isinstance(v, int) and INT64_MIN <= v <= INT64_MAX for v in present):
+            return {
+                "kind": "i8",
+                "data": _pack("q", [0 if v is None else v for v in values]),
+                "nulls": [i for i, v in enumerate(values) if v is None]
+            }
+        if all(isinstance(v, float) for v in present):
+            return {"kind": "f8", "data": _pack("d", [math.nan if v is None else v for v in values])}
+
+    if present and all(isinstance(v, list) and all(isinstance(t, str) for t in v) for v in values):
+        dictionary, ids, offsets = {}, [], [0]
+        for tags in values:
+            for tag in tags:
+                ids.append(dictionary.setdefault(tag, len(dictionary)))
+            offsets.append(len(ids))
+        typecode = _code_typecode(len(dictionary))
+        return {
+            "kind": "tags",
+            "values": list(dictionary),
+            "typecode": typecode,
+            "data": _pack(typecode, ids),
+            "offsets": _pack("I", offsets)
+        }
+
+    if values and all(isinstance(v, str) for v in values):
+        prefix = _common_prefix(values)
+        suffixes = [v[len(prefix):] for v in values]
+        if all(0 < len(s) <= 18 and s.isascii() and s.isdigit() and str(int(s)) == s for s in suffixes):
+            return {"kind": "seq", "prefix": prefix, "data": _pack("q", [int(s) for s in suffixes])}
+
+    if all(v is None or isinstance(v, str) for v in values):
+        dictionary = {}
+        for v in values:
+            dictionary.setdefault(v, len(dictionary))
+        if len(dictionary) <= max(1, len(values) // 2):
+            typecode = _code_typecode(len(dictionary))
+            return {
+                "kind": "dict",
+                "values": list(dictionary),
+                "typecode": typecode,
+                "data": _pack(typecode, [dictionary[v] for v in values])
+            }
+
+    return {"kind": "plain", "values": list(values)}
+
+def decode_column(column, count):
+    """Decode one column back into a list of Python values"""
+    kind = column["kind"]
+    if kind == "f8":
+        return [None if v != v else v for v in _unpack("d", column["data"])]
+    if kind == "i8":
+        values = _unpack("q", column["data"]).tolist()
+        for i in column.get("nulls", []):
+            values[i] = None
+        return values
+    if kind == "dict":
+        dictionary = column["values"]
+        return [dictionary[code] for code in _unpack(column["typecode"], column["data"])]
+    if kind == "seq":
+        prefix = column["prefix"]
+        return [prefix + str(v) for v in _unpack("q", column["data"])]
+    if kind == "tags":
+        dictionary = column["values"]
+        ids = _unpack(column["typecode"], column["data"])
+        offsets = _unpack("I", column["offsets"])
+        return [[dictionary[t] for t in ids[offsets[i]:offsets[i + 1]]] for i in range(count)]
+    return list(column["values"])
+
+def encode_trades(trades):
+    """Encode a list of trade dicts into a compact column-oriented document"""
+    fields = [f for f in FIELD_ORDER if any(f in t for t in trades[:1])]
+    fields += sorted({k for t in trades for k in t} - set(fields))
+    return {
+        "encoding": ENCODING,
+        "count": len(trades),
+        "fields": fields,
+        "columns": {f: encode_column([t.get(f) for t in trades]) for f in fields}
+    }
+
+def decode_trades(encoded):
+    """Decode a compact column-oriented document back into trade dicts"""
+    if encoded.get("encoding") != ENCODING:
+        raise ValueError(f"Unsupported trade encoding: {encoded.get('encoding')}")
+    count = encoded["count"]
+    fields = encoded["fields"]
+    columns = [decode_column(encoded["columns"][f], count) for f in fields]
+    return [dict(zip(fields, row)) for row in zip(*columns)]
+
+print("✓ Trade_codec module loaded successfully")